@@ -6,156 +6,291 @@
 # ============================================================
 
 import polars as pl
-import pandas as pd
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, html, dcc, Input, Output, no_update
+from dash.exceptions import PreventUpdate
 import plotly.express as px
-import warnings
 
-warnings.simplefilter(action="ignore", category=pd.errors.SettingWithCopyWarning)
+from snib_cache_figuras import cache_figuras, exponer_estadisticas
+from snib_carga import CargaEnSegundoPlano, guardar_opciones, indicador_carga, leer_opciones
+from snib_compartido import cargar_compartido, indice_rebanadas
+from snib_ejecucion import ejecutar
+from snib_esquema import enum_con
+from snib_limpieza import cargar_limpio
+from snib_metricas import exponer_metricas, fase
+from snib_top import top_n_con_otras
 
 # ============================================================
-# 1. CARGA Y TRANSFORMACIÓN (POLARS)
+# 1. Configuracion
 # ============================================================
 
-parquet_path = r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet"
+N = 10
 
-snib_lazy_df = pl.scan_parquet(parquet_path)
+# ============================================================
+# 2. CONSULTA (POLARS)
+# ============================================================
+# El cubo limpio se abre dentro de la carga en segundo plano: si hay que
+# regenerarlo (cubo mas nuevo), el arranque de la app no lo espera.
+
+def consulta_top(snib_lazy_df):
+    """Top N de pares país-colección en cada año; el resto pasa a "Otras"."""
+    return (
+        top_n_con_otras(
+            snib_lazy_df.filter(
+                pl.col("aniocolecta").is_not_null() &
+                pl.col("coleccion").is_not_null() &
+                pl.col("paiscoleccion").is_not_null()
+            ),
+            "coleccion",
+            N,
+            por=["aniocolecta"],
+            unidad=["paiscoleccion"],
+            alias="coleccion_agrupada",
+        )
+        .sort(["aniocolecta", "conteo"], descending=[False, True])
+    )
+
+# Los datos se quedan en Polars hasta Plotly: no se convierte a pandas
 
 # ============================================================
-# 2. Configuracion y limpieza de datos
+# 3. REBANADAS PRECALCULADAS POR (AÑO, PAÍS)
 # ============================================================
+# El callback solo busca en un índice; los top de colecciones y de países se
+# calculan una vez al arrancar para cada combinación de año y país presente
+# en los datos, incluidos los comodines "Todos".
+#
+# Los cuatro niveles (año y país, solo año, solo país, todos) se apilan en un
+# mismo DataFrame con sus claves, así cada cálculo es una sola agrupación.
 
-valores_excluir = ["NO APLICA", " ", "NO DISPONIBLE", "", "NaN", "null", None]
-N = 10
+CLAVES = ["anio_clave", "pais_clave"]
+
+
+def preparar_rebanadas():
 
-final_polars_df = (
-    snib_lazy_df
-    .filter(
-        pl.col("aniocolecta").is_not_null() &
-        pl.col("coleccion").is_not_null() &
-        pl.col("paiscoleccion").is_not_null() &
-        ~pl.col("coleccion").is_in(valores_excluir) &
-        ~pl.col("paiscoleccion").is_in(valores_excluir)
+    # Cubo de agregados ya limpio: centinelas en null y años como Int16
+    snib_lazy_df = cargar_limpio()
+
+    # "Todos" no es un país del diccionario: las claves de país usan un Enum ampliado
+    tipo_pais_clave = enum_con(snib_lazy_df.collect_schema()["paiscoleccion"], "Todos")
+
+    final_polars_df = ejecutar(consulta_top(snib_lazy_df))
+
+    niveles_df = pl.concat([
+        final_polars_df.with_columns(
+            (pl.col("aniocolecta").cast(pl.Utf8) if por_anio else pl.lit("Todos")).alias("anio_clave"),
+            (pl.col("paiscoleccion").cast(tipo_pais_clave) if por_pais else pl.lit("Todos", dtype=tipo_pais_clave)).alias("pais_clave"),
+        )
+        for por_anio in (True, False)
+        for por_pais in (True, False)
+    ])
+
+    top_colecciones_df = (
+        niveles_df
+        .group_by(CLAVES + ["coleccion_agrupada"])
+        .agg(pl.col("conteo").sum())
+        .sort("conteo", descending=True)
+        .group_by(CLAVES, maintain_order=True)
+        .head(N)
     )
-    .with_columns(
-        pl.when(pl.col("aniocolecta").cast(pl.Utf8).str.strip_chars().is_in(["null", "", "0"]))
-        .then(None)
-        .otherwise(pl.col("aniocolecta"))
-        .alias("aniocolecta")
+
+    # País asociado (modo): el país más frecuente por colección en cada rebanada;
+    # en empate gana el primero en orden alfabético
+    pais_modo_df = (
+        niveles_df
+        .group_by(CLAVES + ["coleccion_agrupada", "paiscoleccion"])
+        .agg(pl.len().alias("frecuencia"))
+        .sort([pl.col("frecuencia"), pl.col("paiscoleccion").cast(pl.Utf8)], descending=[True, False])
+        .unique(CLAVES + ["coleccion_agrupada"], keep="first", maintain_order=True)
+        .select(CLAVES + ["coleccion_agrupada", pl.col("paiscoleccion").cast(pl.Utf8).alias("País asociado")])
     )
-    .with_columns(pl.col("aniocolecta").cast(pl.Int32, strict=False))
-    .filter(pl.col("aniocolecta").is_not_null())
-    .group_by(["aniocolecta", "paiscoleccion", "coleccion"])
-    .agg(pl.len().alias("conteo"))
-    .with_columns(
-        pl.col("conteo").rank("dense", descending=True).over("aniocolecta").alias("rank")
+
+    top_colecciones_df = (
+        top_colecciones_df
+        .join(pais_modo_df, on=CLAVES + ["coleccion_agrupada"], how="left", maintain_order="left")
+        .with_columns(
+            pl.when(pl.col("coleccion_agrupada") == "Otras")
+            .then(pl.lit(""))
+            .otherwise(pl.col("País asociado").fill_null(""))
+            .alias("País asociado")
+        )
     )
-    .with_columns(
-        pl.when(pl.col("rank") <= N)
-        .then(pl.col("coleccion"))
-        .otherwise(pl.lit("Otras"))
-        .alias("coleccion_agrupada")
+
+    top_paises_df = (
+        niveles_df
+        .group_by(CLAVES + ["paiscoleccion"])
+        .agg(pl.col("conteo").sum())
+        .sort("conteo", descending=True)
+        .group_by(CLAVES, maintain_order=True)
+        .head(10)
     )
-    .group_by(["aniocolecta", "paiscoleccion", "coleccion_agrupada"])
-    .agg(pl.sum("conteo").alias("conteo"))
-    .sort(["aniocolecta", "conteo"], descending=[False, True])
-    .collect()
-)
 
-df = final_polars_df.to_pandas()
+    # Ordenadas por clave para que cada rebanada sea un bloque contiguo de filas
+    return {
+        "top_colecciones": top_colecciones_df.sort(CLAVES, maintain_order=True),
+        "top_paises": top_paises_df.sort(CLAVES, maintain_order=True),
+    }
+
+
+def _indice(top_df):
+    return {
+        (anio if anio == "Todos" else int(anio), pais): posicion
+        for (anio, pais), posicion in indice_rebanadas(top_df, CLAVES).items()
+    }
+
+
+def rebanada(top_df, indice, clave):
+    # Cada rebanada es una vista sin copia que Plotly lee directamente
+    inicio, largo = indice.get(clave, (0, 0))
+    return top_df.slice(inicio, largo).drop(CLAVES)
+
 
 # ============================================================
-# 3. DROPDOWNS
+# 3.1 CARGA EN SEGUNDO PLANO Y DROPDOWNS
 # ============================================================
+# La app arranca sin esperar este cálculo; mientras tanto los dropdowns usan
+# las opciones guardadas en la carga anterior.
 
-years = sorted(df["aniocolecta"].dropna().unique().tolist())
-year_options = [{"label": "Todos", "value": "Todos"}] + [
-    {"label": int(y), "value": int(y)} for y in years
-]
+def cargar_datos():
 
-pais_totales = (
-    df.groupby("paiscoleccion")["conteo"].sum()
-    .sort_values(ascending=False)
-    .reset_index()
-)
+    # Con SNIB_DATOS_IPC definida, los workers comparten estas tablas mapeadas en memoria
+    tablas = cargar_compartido("dashboard1", preparar_rebanadas)
+    top_colecciones_df = tablas["top_colecciones"]
+    top_paises_df = tablas["top_paises"]
+
+    indice_paises = _indice(top_paises_df)
+
+    years = sorted({anio for anio, _ in indice_paises if anio != "Todos"})
+    year_options = [{"label": "Todos", "value": "Todos"}] + [
+        {"label": int(y), "value": int(y)} for y in years
+    ]
+
+    # Las rebanadas ("Todos", país) tienen el total de cada país
+    pais_totales = (
+        top_paises_df
+        .filter((pl.col("anio_clave") == "Todos") & (pl.col("pais_clave") != "Todos"))
+        .sort("conteo", descending=True)
+    )
+
+    country_options = [{"label": "Todos", "value": "Todos"}] + [
+        {"label": pais, "value": pais}
+        for pais in pais_totales["paiscoleccion"].to_list()
+    ]
+
+    opciones = {"anios": year_options, "paises": country_options}
+    guardar_opciones("dashboard1", opciones)
+
+    return {
+        "top_colecciones": top_colecciones_df,
+        "top_paises": top_paises_df,
+        "indice_colecciones": _indice(top_colecciones_df),
+        "indice_paises": indice_paises,
+        "opciones": opciones,
+    }
+
+
+carga = CargaEnSegundoPlano(cargar_datos, "dashboard1")
+
+OPCIONES_VACIAS = {
+    "anios": [{"label": "Todos", "value": "Todos"}],
+    "paises": [{"label": "Todos", "value": "Todos"}],
+}
+
+
+def opciones_actuales():
+    if carga.lista:
+        return carga.resultado["opciones"]
+    return leer_opciones("dashboard1") or OPCIONES_VACIAS
 
-country_options = [{"label": "Todos", "value": "Todos"}] + [
-    {"label": row["paiscoleccion"], "value": row["paiscoleccion"]}
-    for _, row in pais_totales.iterrows()
-]
 
 # ============================================================
 # 4. LAYOUT — DOS GRÁFICAS LADO A LADO
 # ============================================================
 
 app = Dash(__name__)
+server = app.server  # para servidores WSGI (ver snib_servidor.py)
 
-app.layout = html.Div([
 
-    html.H1("EJEMPLARES POR COLECCIÓN Y PAÍS EN EL SNIB", 
-            style={"textAlign": "center"}),
+def serve_layout():
 
-    html.Div([
-        html.Div([
-            html.Label("Seleccionar Año:"),
-            dcc.Dropdown(id="dropdown_anio", options=year_options, value="Todos", clearable=False)
-        ], style={"width": "48%", "display": "inline-block"}),
+    opciones = opciones_actuales()
 
-        html.Div([
-            html.Label("Seleccionar País:"),
-            dcc.Dropdown(id="dropdown_pais", options=country_options, value="Todos", clearable=False)
-        ], style={"width": "48%", "display": "inline-block"})
-    ], style={"padding": "10px 20px"}),
+    return html.Div([
+
+        html.H1("EJEMPLARES POR COLECCIÓN Y PAÍS EN EL SNIB", 
+                style={"textAlign": "center"}),
+
+        indicador_carga(carga),
 
-    html.Div([
         html.Div([
-            dcc.Graph(id="graf_top_colecciones")
-        ], style={"width": "50%", "display": "inline-block"}),
+            html.Div([
+                html.Label("Seleccionar Año:"),
+                dcc.Dropdown(id="dropdown_anio", options=opciones["anios"], value="Todos", clearable=False)
+            ], style={"width": "48%", "display": "inline-block"}),
+
+            html.Div([
+                html.Label("Seleccionar País:"),
+                dcc.Dropdown(id="dropdown_pais", options=opciones["paises"], value="Todos", clearable=False)
+            ], style={"width": "48%", "display": "inline-block"})
+        ], style={"padding": "10px 20px"}),
 
         html.Div([
-            dcc.Graph(id="graf_top_paises")
-        ], style={"width": "50%", "display": "inline-block"})
+            html.Div([
+                dcc.Graph(id="graf_top_colecciones")
+            ], style={"width": "50%", "display": "inline-block"}),
+
+            html.Div([
+                dcc.Graph(id="graf_top_paises")
+            ], style={"width": "50%", "display": "inline-block"})
+        ])
+
     ])
 
-])
+
+# El layout se arma en cada visita para reflejar si los datos ya están listos
+app.layout = serve_layout
 
 # ============================================================
-# 5. CALLBACK
+# 5. CALLBACKS
 # ============================================================
 
 @app.callback(
-    Output("graf_top_colecciones", "figure"),
-    Output("graf_top_paises", "figure"),
-    Input("dropdown_anio", "value"),
-    Input("dropdown_pais", "value")
+    Output("dropdown_anio", "options"),
+    Output("dropdown_pais", "options"),
+    Output("estado_carga", "children"),
+    Output("datos_listos", "data"),
+    Output("intervalo_carga", "disabled"),
+    Input("intervalo_carga", "n_intervals")
 )
-def update_charts(selected_year, selected_country):
+def revisar_carga(_):
 
-    df_filtrado = df.copy()
+    if carga.error is not None:
+        return no_update, no_update, f"Error al cargar los datos: {carga.error}", False, True
 
-    if selected_year != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["aniocolecta"] == selected_year]
+    if not carga.lista:
+        raise PreventUpdate
 
-    if selected_country != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["paiscoleccion"] == selected_country]
+    opciones = carga.resultado["opciones"]
+    return opciones["anios"], opciones["paises"], "", True, True
 
-    # ===================== TOP COLECCIONES =====================
 
-    top_colecciones = (
-        df_filtrado.groupby("coleccion_agrupada")["conteo"].sum()
-        .reset_index()
-        .sort_values("conteo", ascending=False)
-        .head(N)
-    )
+@app.callback(
+    Output("graf_top_colecciones", "figure"),
+    Output("graf_top_paises", "figure"),
+    Input("dropdown_anio", "value"),
+    Input("dropdown_pais", "value"),
+    Input("datos_listos", "data")
+)
+@cache_figuras()
+def update_charts(selected_year, selected_country, datos_listos):
 
-    # obtener país asociado (modo)
-    top_colecciones["País asociado"] = top_colecciones["coleccion_agrupada"].apply(
-        lambda x: (
-            df_filtrado[df_filtrado["coleccion_agrupada"] == x]["paiscoleccion"].mode()[0]
-            if x != "Otras" and not df_filtrado[df_filtrado["coleccion_agrupada"] == x].empty
-            else ""
-        )
-    )
+    # Hasta que termine la carga no hay nada que graficar (y no se guarda en cache)
+    if not datos_listos or not carga.lista:
+        raise PreventUpdate
+
+    datos = carga.resultado
+    clave = (selected_year, selected_country)
+    with fase("filtrado"):
+        top_colecciones = rebanada(datos["top_colecciones"], datos["indice_colecciones"], clave)
+        top_paises = rebanada(datos["top_paises"], datos["indice_paises"], clave)
 
     # Año en título
     titulo_anio = selected_year if selected_year != "Todos" else "Todos los años"
@@ -177,13 +312,6 @@ def update_charts(selected_year, selected_country):
 
     # ===================== TOP PAISES =====================
 
-    top_paises = (
-        df_filtrado.groupby("paiscoleccion")["conteo"].sum()
-        .sort_values(ascending=False)
-        .reset_index()
-        .head(10)
-    )
-
     fig_paises = px.bar(
         top_paises,
         y="paiscoleccion",
@@ -201,6 +329,10 @@ def update_charts(selected_year, selected_country):
     return fig_colecciones, fig_paises
 
 
+exponer_estadisticas(app, update_charts)
+exponer_metricas(app, update_charts)
+
+
 # ============================================================
 # 6. EJECUCIÓN DEL SERVIDOR
 # ============================================================
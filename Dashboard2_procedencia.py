@@ -1,119 +1,205 @@
 # --- 1. IMPORTACIONES ---
-from dash import Dash, dcc, html, Output, Input
+from dash import Dash, dcc, html, Output, Input, State, no_update
+from dash.exceptions import PreventUpdate
 import polars as pl
 import plotly.express as px
 
-# --- 2. CARGA DE DATOS ---
-parquet_path = r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet"
+from snib_cache_figuras import cache_figuras, exponer_estadisticas
+from snib_carga import CargaEnSegundoPlano, guardar_opciones, indicador_carga, leer_opciones
+from snib_compartido import cargar_compartido, indice_rebanadas
+from snib_ejecucion import ejecutar
+from snib_limpieza import cargar_limpio
+from snib_metricas import exponer_metricas, fase
+from snib_procedencia import PROCEDENCIA_ES, traducir
 
-    snib_lazy_df = pl.scan_parquet(parquet_path)
-
-# --- 3. CONFIGURACIÓN Y LIMPIEZA DE DATOS ---
+# --- 2. CONFIGURACIÓN ---
 COLUMNAS_INTERES = ["aniocolecta", "paiscoleccion", "procedenciaejemplar", "grupobio"]
-VALORES_EXCLUIR = ["NO APLICA", "NO DISPONIBLE", "no disponible", None]
-
-base_limpia_df = (
-    snib_lazy_df
-    .filter(pl.all_horizontal(pl.col(COLUMNAS_INTERES).is_not_null()))
-    .filter(~pl.any_horizontal(pl.col(COLUMNAS_INTERES).is_in(VALORES_EXCLUIR)))
-    .with_columns(pl.col("aniocolecta").cast(pl.Int64, strict=False))
-    .filter(pl.col("aniocolecta").is_between(1500, 2025))
-)
 
-# --- 4. MAPEADO DE CATEGORÍAS (TRADUCCIÓN) ---
-mapeo_procedencia = {
-    "HumanObservation": "Observación humana",
-    "PreservedSpecimen": "Especimen preservado",
-    "MachineObservation": "Observación de máquina",
-    "LivingSpecimen": "Especimen vivo",
-    "FossilSpecimen": "Especimen fósil",
-    "Occurrence": "Evidencia",
-    "Materialsample": "Muestra registrada",
-    "MaterialCitation": "Material citado"
-}
-
-mapeo_df = pl.DataFrame({
-    "procedenciaejemplar": list(mapeo_procedencia.keys()),
-    "procedenciaejemplar_es": list(mapeo_procedencia.values())
-})
-
-base_limpia_df = base_limpia_df.join(mapeo_df.lazy(), on="procedenciaejemplar", how="left")
-base_limpia_df = base_limpia_df.filter(pl.col("procedenciaejemplar_es").is_not_null())
-
-# --- 5. PREPARACIÓN DE DATOS PARA LOS GRÁFICOS ---
-app_df = (
-    base_limpia_df
-    .group_by(["aniocolecta", "paiscoleccion", "grupobio", "procedenciaejemplar_es"])
-    .agg(pl.len().alias("total_registros"))
-    .collect()
-    .to_pandas()
-)
 
-print(f"✓ Total de registros procesados: {len(app_df)}")
-print(f"✓ Años disponibles: {app_df['aniocolecta'].min()} - {app_df['aniocolecta'].max()}")
-print(f"✓ Países únicos: {app_df['paiscoleccion'].nunique()}")
+# --- 3. LIMPIEZA Y MAPEADO DE CATEGORÍAS (TRADUCCIÓN) ---
+# Solo se muestran las procedencias con traducción; se filtran por código del
+# Enum y la etiqueta en español se asigna después de agregar (snib_procedencia)
+def base_limpia(snib_lazy_df):
+    return (
+        snib_lazy_df
+        .filter(pl.all_horizontal(pl.col(COLUMNAS_INTERES).is_not_null()))
+        .filter(pl.col("aniocolecta").is_between(1500, 2025))
+        .filter(pl.col("procedenciaejemplar").is_in(list(PROCEDENCIA_ES)))
+    )
+
+
+# --- 4. PREPARACIÓN DE DATOS PARA LOS GRÁFICOS ---
+# Corre dentro de la carga en segundo plano: abrir el cubo limpio (y
+# regenerarlo si el cubo cambió) no retrasa el arranque de la app.
+def preparar_datos():
+    # Cubo de agregados ya limpio: centinelas en null y años como Int16
+    snib_lazy_df = cargar_limpio()
+    tipo_procedencia = snib_lazy_df.collect_schema()["procedenciaejemplar"]
+
+    app_df = ejecutar(
+        base_limpia(snib_lazy_df)
+        .group_by(["aniocolecta", "paiscoleccion", "grupobio", "procedenciaejemplar"])
+        .agg(pl.col("conteo").sum().alias("total_registros"))
+        # País, grupo y procedencia son Enum del cubo limpio; los datos no pasan a pandas
+        .select(
+            "aniocolecta", "paiscoleccion", "grupobio",
+            traducir("procedenciaejemplar", tipo_procedencia).alias("procedenciaejemplar_es"),
+            "total_registros",
+        )
+        # Ordenado por (año, país) para que cada selección sea un bloque contiguo
+        .sort(["aniocolecta", "paiscoleccion"])
+    )
+    return {"app": app_df}
+
+
+# --- 4.1. Carga en segundo plano ---
+# La app arranca sin esperar este cálculo; mientras tanto los dropdowns usan
+# las opciones guardadas en la carga anterior.
+def cargar_datos():
+
+    # Con SNIB_DATOS_IPC definida, los workers comparten la tabla mapeada en memoria
+    app_df = cargar_compartido("dashboard2", preparar_datos)["app"]
+
+    print(f"✓ Total de registros procesados: {app_df.height}")
+    print(f"✓ Años disponibles: {app_df['aniocolecta'].min()} - {app_df['aniocolecta'].max()}")
+    print(f"✓ Países únicos: {app_df['paiscoleccion'].n_unique()}")
+
+    # Listas para los filtros
+    available_years = sorted(app_df['aniocolecta'].unique().to_list())
+    available_countries = sorted(app_df['paiscoleccion'].cast(pl.Utf8).unique().to_list())
+
+    opciones = {"anios": available_years, "paises": available_countries}
+    guardar_opciones("dashboard2", opciones)
+
+    return {
+        "app": app_df,
+        # Posición de cada (año, país) para el callback
+        "indice": indice_rebanadas(app_df, ["aniocolecta", "paiscoleccion"]),
+        "opciones": opciones,
+    }
+
+
+carga = CargaEnSegundoPlano(cargar_datos, "dashboard2")
+
+
+def opciones_actuales():
+    if carga.lista:
+        return carga.resultado["opciones"]
+    return leer_opciones("dashboard2") or {"anios": [], "paises": []}
 
-# --- 5.1. Obtener Listas para los Filtros ---
-available_years = sorted(app_df['aniocolecta'].unique())
-available_countries = sorted(app_df['paiscoleccion'].unique())
 
 # --- 6. CONSTRUCCIÓN DE LA APLICACIÓN DASH ---
 app = Dash(__name__)
+server = app.server  # para servidores WSGI (ver snib_servidor.py)
+
+
+def serve_layout():
+
+    opciones = opciones_actuales()
+    available_years = opciones["anios"]
+    available_countries = opciones["paises"]
+
+    return html.Div(style={'fontFamily': 'Arial, sans-serif', 'padding': '20px'}, children=[
 
-app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'padding': '20px'}, children=[
-
-    html.H1("Total de ejemplares por procedencia, país y año",
-            style={'textAlign': 'center', 'color': '#2c3e50'}),
-
-    html.P(
-        "Seleccione un año y un país para visualizar los resultados.",
-        style={'textAlign': 'center', 'color': '#2c3e50', 'marginTop': '-10px'}
-    ),
-
-    html.Div(style={'display': 'flex', 'justifyContent': 'center',
-                    'gap': '30px', 'padding': '20px',
-                    'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}, children=[
-
-        html.Div(children=[
-            html.Label("Seleccionar Año:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='year-dropdown',
-                options=[{'label': year, 'value': year} for year in available_years],
-                value=available_years[-1], clearable=False
-            )
-        ], style={'width': '300px'}),
-
-        html.Div(children=[
-            html.Label("Seleccionar País:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='country-dropdown',
-                options=[{'label': country, 'value': country} for country in available_countries],
-                value=available_countries[0]
-            )
-        ], style={'width': '300px'})
-    ]),
-
-    html.Div(style={'display': 'flex', 'flexDirection': 'row', 'gap': '20px', 'marginTop': '20px'}, children=[
-        html.Div(dcc.Graph(id='bubble-chart'), style={'flex': '1.5'}),
-        html.Div(dcc.Graph(id='bar-chart-aves'), style={'flex': '1'})
+        html.H1("Total de ejemplares por procedencia, país y año",
+                style={'textAlign': 'center', 'color': '#2c3e50'}),
+
+        html.P(
+            "Seleccione un año y un país para visualizar los resultados.",
+            style={'textAlign': 'center', 'color': '#2c3e50', 'marginTop': '-10px'}
+        ),
+
+        indicador_carga(carga),
+
+        html.Div(style={'display': 'flex', 'justifyContent': 'center',
+                        'gap': '30px', 'padding': '20px',
+                        'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}, children=[
+
+            html.Div(children=[
+                html.Label("Seleccionar Año:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='year-dropdown',
+                    options=[{'label': year, 'value': year} for year in available_years],
+                    value=available_years[-1] if available_years else None, clearable=False
+                )
+            ], style={'width': '300px'}),
+
+            html.Div(children=[
+                html.Label("Seleccionar País:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='country-dropdown',
+                    options=[{'label': country, 'value': country} for country in available_countries],
+                    value=available_countries[0] if available_countries else None
+                )
+            ], style={'width': '300px'})
+        ]),
+
+        html.Div(style={'display': 'flex', 'flexDirection': 'row', 'gap': '20px', 'marginTop': '20px'}, children=[
+            html.Div(dcc.Graph(id='bubble-chart'), style={'flex': '1.5'}),
+            html.Div(dcc.Graph(id='bar-chart-aves'), style={'flex': '1'})
+        ])
     ])
-])
 
-# --- 7. CALLBACK PARA ACTUALIZAR LOS GRÁFICOS ---
+
+# El layout se arma en cada visita para reflejar si los datos ya están listos
+app.layout = serve_layout
+
+# --- 7. CALLBACK DE LA CARGA: LLENA LOS FILTROS CUANDO LOS DATOS ESTÁN LISTOS ---
+@app.callback(
+    Output('year-dropdown', 'options'),
+    Output('year-dropdown', 'value'),
+    Output('country-dropdown', 'options'),
+    Output('country-dropdown', 'value'),
+    Output('estado_carga', 'children'),
+    Output('datos_listos', 'data'),
+    Output('intervalo_carga', 'disabled'),
+    Input('intervalo_carga', 'n_intervals'),
+    State('year-dropdown', 'value'),
+    State('country-dropdown', 'value')
+)
+def revisar_carga(_, selected_year, selected_country):
+
+    if carga.error is not None:
+        return (no_update,) * 4 + (f"Error al cargar los datos: {carga.error}", False, True)
+
+    if not carga.lista:
+        raise PreventUpdate
+
+    years = carga.resultado["opciones"]["anios"]
+    countries = carga.resultado["opciones"]["paises"]
+
+    return (
+        [{'label': year, 'value': year} for year in years],
+        selected_year if selected_year is not None else (years[-1] if years else None),
+        [{'label': country, 'value': country} for country in countries],
+        selected_country if selected_country is not None else (countries[0] if countries else None),
+        "", True, True
+    )
+
+
+# --- 8. CALLBACK PARA ACTUALIZAR LOS GRÁFICOS ---
 @app.callback(
     Output('bubble-chart', 'figure'),
     Output('bar-chart-aves', 'figure'),
     Input('year-dropdown', 'value'),
-    Input('country-dropdown', 'value')
+    Input('country-dropdown', 'value'),
+    Input('datos_listos', 'data')
 )
-def update_graphs(selected_year, selected_country):
+@cache_figuras()
+def update_graphs(selected_year, selected_country, datos_listos):
 
-    filtered_df = app_df[
-        (app_df['aniocolecta'] == selected_year) &
-        (app_df['paiscoleccion'] == selected_country)
-    ]
+    # Hasta que termine la carga no hay nada que graficar (y no se guarda en cache)
+    if not datos_listos or not carga.lista:
+        raise PreventUpdate
 
-    if filtered_df.empty:
+    datos = carga.resultado
+    with fase("filtrado"):
+        inicio, largo = datos["indice"].get((selected_year, selected_country), (0, 0))
+        filtered_df = datos["app"].slice(inicio, largo)
+        df_burbujas = filtered_df.filter(pl.col('grupobio') != 'Aves')
+        df_aves = filtered_df.filter(pl.col('grupobio') == 'Aves')
+
+    if filtered_df.is_empty():
         empty_fig = px.scatter(title=f"Sin datos para {selected_country}, {selected_year}")
         empty_fig.update_layout(
             annotations=[{
@@ -125,9 +211,7 @@ def update_graphs(selected_year, selected_country):
         return empty_fig, empty_fig
 
     # --- 7.1. Gráfico de Burbujas (sin Aves) ---
-    df_burbujas = filtered_df[filtered_df['grupobio'] != 'Aves']
-
-    if df_burbujas.empty:
+    if df_burbujas.is_empty():
         bubble_fig = px.scatter(title=f"Grupos Biológicos en {selected_country}, {selected_year} (sin Aves)")
         bubble_fig.update_layout(
             annotations=[{
@@ -148,9 +232,7 @@ def update_graphs(selected_year, selected_country):
         bubble_fig.update_layout(transition_duration=500, yaxis_type="log")
 
     # --- 7.2. Gráfico de Barras (Aves) ---
-    df_aves = filtered_df[filtered_df['grupobio'] == 'Aves']
-
-    if df_aves.empty:
+    if df_aves.is_empty():
         bar_aves_fig = px.bar(title=f"Registros de Aves en {selected_country}, {selected_year}")
         bar_aves_fig.update_layout(
             annotations=[{
@@ -173,6 +255,10 @@ def update_graphs(selected_year, selected_country):
     return bubble_fig, bar_aves_fig
 
 
+exponer_estadisticas(app, update_graphs)
+exponer_metricas(app, update_graphs)
+
+
 # ======================================================
 # EJECUCIÓN
 # ======================================================
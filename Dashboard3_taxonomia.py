@@ -0,0 +1,193 @@
+# --- 1. IMPORTACIONES ---
+from dash import Dash, dcc, html, Output, Input, State, ctx
+from dash.exceptions import PreventUpdate
+import plotly.graph_objects as go
+
+from snib_cache_figuras import cache_figuras, exponer_estadisticas
+from snib_carga import CargaEnSegundoPlano, indicador_carga
+from snib_compartido import cargar_compartido
+from snib_cubo import CUBO_TAXONES_PATH
+from snib_limpieza import TAXONES_LIMPIO_PATH
+from snib_metricas import exponer_metricas, fase
+from snib_taxonomia import INDICE_TAXONOMIA_PATH, NOMBRES_RANGOS, RAIZ, SEPARADOR, IndiceTaxonomico
+
+# --- 2. CARGA DEL ÍNDICE TAXONÓMICO ---
+# Árbol de reino a género con el total de cada nodo (snib_taxonomia.py). Leerlo
+# es inmediato, pero IndiceTaxonomico.cargar lo reconstruye (junto con el cubo
+# taxonómico limpio) si es más viejo que el cubo taxonómico: por eso se carga
+# en segundo plano y la app arranca sin esperarlo.
+# Con SNIB_DATOS_IPC definida, los workers comparten la tabla mapeada en memoria.
+def preparar_datos():
+    return {"nodos": IndiceTaxonomico.cargar().nodos}
+
+
+def cargar_datos():
+    fuentes = (CUBO_TAXONES_PATH, TAXONES_LIMPIO_PATH, INDICE_TAXONOMIA_PATH)
+    indice = IndiceTaxonomico(cargar_compartido("dashboard3", preparar_datos, fuentes)["nodos"])
+
+    print(f"✓ Nodos en el índice taxonómico: {indice.nodos.height}")
+    print(f"✓ Reinos: {indice.hijos().height}")
+
+    return {"indice": indice}
+
+
+carga = CargaEnSegundoPlano(cargar_datos, "dashboard3")
+
+
+# --- 3. FIGURA DE UN NODO ---
+# Cada figura lleva solo el nodo seleccionado (al centro) y sus hijos directos;
+# el navegador nunca recibe el árbol completo. Las figuras se guardan en cache
+# por nodo, así volver a un nodo ya visitado no pasa por Plotly.
+@cache_figuras()
+def figura_nodo(nodo):
+
+    indice = carga.resultado["indice"]
+
+    with fase("filtrado"):
+        hijos_df = indice.hijos(nodo)
+
+    ids = hijos_df["id"].to_list()
+    etiquetas = hijos_df["etiqueta"].to_list()
+    padres = hijos_df["padre"].to_list()
+    totales = hijos_df["total"].to_list()
+    niveles = hijos_df["nivel"].to_list()
+
+    # En la raíz no hay nodo central: se muestran los reinos
+    if nodo != RAIZ:
+        centro = indice.nodo(nodo).row(0, named=True)
+        ids.insert(0, centro["id"])
+        etiquetas.insert(0, centro["etiqueta"])
+        padres.insert(0, "")
+        totales.insert(0, centro["total"])
+        niveles.insert(0, centro["nivel"])
+
+    fig = go.Figure(go.Sunburst(
+        ids=ids,
+        labels=etiquetas,
+        parents=padres,
+        values=totales,
+        branchvalues="total",
+        # El id viaja en customdata para leerlo en clickData
+        customdata=[[id_nodo, NOMBRES_RANGOS[nivel]] for id_nodo, nivel in zip(ids, niveles)],
+        textinfo="label+value",
+        hovertemplate=(
+            "<b>%{customdata[1]}:</b> %{label}<br>"
+            "<b>Ruta:</b> %{customdata[0]}<br>"
+            "<b>Cantidad:</b> %{value}<extra></extra>"
+        ),
+    ))
+
+    fig.update_layout(
+        height=750,
+        margin=dict(t=20, l=20, r=20, b=20),
+        uniformtext=dict(minsize=12, mode="hide")
+    )
+
+    return fig
+
+
+def ruta_legible(nodo):
+    if nodo == RAIZ:
+        return "SNIB"
+    return "SNIB / " + nodo.replace(SEPARADOR, " / ")
+
+
+# --- 4. CONSTRUCCIÓN DE LA APLICACIÓN DASH ---
+app = Dash(__name__)
+server = app.server  # para servidores WSGI (ver snib_servidor.py)
+
+
+def serve_layout():
+
+    # Mientras se carga el índice la gráfica queda vacía; navegar la dibuja al terminar
+    figura = figura_nodo(RAIZ) if carga.lista else go.Figure()
+
+    return html.Div(style={'fontFamily': 'Arial, sans-serif', 'padding': '20px'}, children=[
+
+        html.H1("Distribución taxonómica del SNIB",
+                style={'textAlign': 'center', 'color': '#2c3e50'}),
+
+        html.P(
+            "Haga clic en un grupo para ver sus subgrupos; clic en el centro para subir un nivel.",
+            style={'textAlign': 'center', 'color': '#2c3e50', 'marginTop': '-10px'}
+        ),
+
+        indicador_carga(carga),
+
+        html.Div(id='ruta-taxonomica', children=ruta_legible(RAIZ),
+                 style={'textAlign': 'center', 'fontWeight': 'bold', 'padding': '10px',
+                        'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}),
+
+        dcc.Store(id='nodo-actual', data=RAIZ),
+
+        dcc.Graph(id='sunburst-taxonomia', figure=figura)
+    ])
+
+
+# El layout se arma en cada visita para reflejar si los datos ya están listos
+app.layout = serve_layout
+
+# --- 5. CALLBACK DE LA CARGA: AVISA CUANDO EL ÍNDICE ESTÁ LISTO ---
+@app.callback(
+    Output('estado_carga', 'children'),
+    Output('datos_listos', 'data'),
+    Output('intervalo_carga', 'disabled'),
+    Input('intervalo_carga', 'n_intervals')
+)
+def revisar_carga(_):
+
+    if carga.error is not None:
+        return f"Error al cargar los datos: {carga.error}", False, True
+
+    if not carga.lista:
+        raise PreventUpdate
+
+    return "", True, True
+
+
+# --- 6. CALLBACK: BAJAR O SUBIR UN NIVEL ---
+# También dibuja la raíz cuando el índice termina de cargarse después de
+# servir el layout.
+@app.callback(
+    Output('sunburst-taxonomia', 'figure'),
+    Output('nodo-actual', 'data'),
+    Output('ruta-taxonomica', 'children'),
+    Input('sunburst-taxonomia', 'clickData'),
+    Input('datos_listos', 'data'),
+    State('nodo-actual', 'data'),
+    prevent_initial_call=True
+)
+def navegar(click_data, datos_listos, nodo_actual):
+
+    if not datos_listos or not carga.lista:
+        raise PreventUpdate
+
+    if ctx.triggered_id == 'datos_listos':
+        return figura_nodo(RAIZ), RAIZ, ruta_legible(RAIZ)
+
+    if not click_data:
+        raise PreventUpdate
+
+    seleccionado = click_data["points"][0]["customdata"][0]
+
+    if seleccionado == nodo_actual:
+        # Clic en el centro: se regresa al padre
+        nuevo = nodo_actual.rpartition(SEPARADOR)[0]
+    elif carga.resultado["indice"].hijos(seleccionado).is_empty():
+        # Género: no hay nivel más abajo
+        raise PreventUpdate
+    else:
+        nuevo = seleccionado
+
+    return figura_nodo(nuevo), nuevo, ruta_legible(nuevo)
+
+
+exponer_estadisticas(app, figura_nodo)
+exponer_metricas(app, figura_nodo)
+
+
+# ======================================================
+# EJECUCIÓN
+# ======================================================
+if __name__ == "__main__":
+    app.run(debug=True)
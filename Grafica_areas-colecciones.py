@@ -2,119 +2,105 @@
 import polars as pl
 import plotly.graph_objects as go
 
+from snib_cache_resultados import collect_en_cache
+from snib_esquema import resumen_esquema
+from snib_figuras import ajustar_a_presupuesto
+from snib_graficas import cargar_datos, registrar_grafica
+from snib_top import top_n_con_otras
 
-# -------------------------------------------------------
-# 1. Cargar datos en modo lazy 
-# -------------------------------------------------------
-
-SNIB_DATA_PARQUET = "./data/SNIBEjemplares_20250803_233426.parquet"
-snib_lazy_df = pl.scan_parquet(SNIB_DATA_PARQUET)
 
 # -------------------------------------------------------
-# 2. Contar ejemplares por año y colección 
+# 1. Contar ejemplares por año y colección: las 9 colecciones más grandes
+#    y el resto en "otras", en un solo plan
 # -------------------------------------------------------
-valores_excluir = ["NO APLICA", "NO DISPONIBLE", "", " "]
-
-conteo_df = (
-    snib_lazy_df
-    .select(["aniocolecta", "coleccion"])
-    .filter(
-        pl.col("coleccion").is_not_null() &
-        pl.col("aniocolecta").is_not_null()
+def contar(snib_lazy_df):
+
+    conteo_final_df = collect_en_cache(
+        top_n_con_otras(
+            snib_lazy_df
+            .select(["aniocolecta", "coleccion", "conteo"])
+            .filter(
+                pl.col("coleccion").is_not_null() &
+                pl.col("aniocolecta").is_not_null()
+            ),
+            "coleccion",
+            9,
+            conservar=["aniocolecta"],
+            etiqueta="otras",
+            alias="coleccion_agrupada",
+        )
+        .sort(["aniocolecta", "coleccion_agrupada"])
     )
-    .filter(~pl.col("aniocolecta").cast(pl.Utf8).str.contains("null"))  
-    .filter(~pl.col("coleccion").is_in(valores_excluir))
-    .group_by(["aniocolecta", "coleccion"])
-    .agg(pl.len().alias("conteo"))
-    .collect()  
-)
 
-print("conteo_df shape:", conteo_df.shape)
-print("conteo_df columns:", conteo_df.columns)
-print("conteo_df dtypes:", conteo_df.dtypes)
+    top9_colecciones = [
+        coleccion
+        for coleccion in conteo_final_df["coleccion_agrupada"].unique().to_list()
+        if coleccion != "otras"
+    ]
 
-# -------------------------------------------------------
-# 3. Obtener las 9 colecciones más grandes
-# -------------------------------------------------------
-top9_colecciones = (
-    conteo_df
-    .group_by("coleccion")
-    .agg(pl.col("conteo").sum().alias("total"))
-    .sort("total", descending=True)
-    .limit(9)
-    .select("coleccion")
-    .to_series()
-    .to_list()
-)
-
-print("top9_colecciones:", top9_colecciones)
-
-# -------------------------------------------------------
-# 4. Agrupar colecciones pequeñas en "otras"
-# -------------------------------------------------------
-conteo_final_df = (
-    conteo_df
-    .with_columns(
-        pl.when(pl.col("coleccion").is_in(top9_colecciones))
-        .then(pl.col("coleccion"))
-        .otherwise(pl.lit("otras"))  
-        .alias("coleccion_agrupada")
-    )
-    .group_by(["aniocolecta", "coleccion_agrupada"])
-    .agg(pl.col("conteo").sum().alias("conteo"))
-    .sort(["aniocolecta", "coleccion_agrupada"])
-)
+    print("top9_colecciones:", top9_colecciones)
 
-print("conteo_final_df shape:", conteo_final_df.shape)
-print("conteo_final_df columns:", conteo_final_df.columns)
-print("conteo_final_df dtypes:", conteo_final_df.dtypes)
+    print("conteo_final_df shape:", conteo_final_df.shape)
+    print("conteo_final_df tipos:", resumen_esquema(conteo_final_df.schema))
 
+    return conteo_final_df
 
-conteo_final_df = conteo_final_df.with_columns(
-    pl.col("aniocolecta").cast(pl.Utf8).cast(pl.Int32)  
-)
 
 # -------------------------------------------------------
-# 5. Pivotar tabla a formato ancho
+# 2. Construir gráfica de áreas acumuladas
 # -------------------------------------------------------
-tabla_wide = (
-    conteo_final_df.pivot(
-        values="conteo",
-        index="aniocolecta",
-        on="coleccion_agrupada",
-        aggregate_function="first"
+# La figura se arma dentro del presupuesto de tamaño (snib_figuras): si el
+# rango completo de años no cabe, los años se agrupan en intervalos.
+def dibujar(conteo_df, ancho):
+
+    # Pivotar tabla a formato ancho
+    df_wide = (
+        conteo_df.pivot(
+            values="conteo",
+            index="aniocolecta",
+            on="coleccion_agrupada",
+            aggregate_function="first"
+        )
+        .fill_null(0)
     )
-    .fill_null(0)
-)
 
-print("tabla_wide shape:", tabla_wide.shape)
-print("tabla_wide columns:", tabla_wide.columns)
+    print("tabla_wide shape:", df_wide.shape)
 
-# -------------------------------------------------------
-# 6. Construir gráfica de áreas acumuladas
-# -------------------------------------------------------
-df_wide = tabla_wide
-x = df_wide["aniocolecta"].to_list()
+    x = df_wide["aniocolecta"].to_numpy()
 
-fig = go.Figure()
+    fig = go.Figure()
 
-for col in df_wide.columns:
-    if col != "aniocolecta":
-        fig.add_trace(go.Scatter(
-            x=x,
-            y=df_wide[col].to_list(),
-            stackgroup='one',
-            name=col
-        ))
+    for col in df_wide.columns:
+        if col != "aniocolecta":
+            fig.add_trace(go.Scatter(
+                x=x,
+                y=df_wide[col].to_numpy(),
+                stackgroup='one',
+                name=col
+            ))
 
-fig.update_layout(
-    title="Tendencia temporal de ejemplares en las 9 colecciones principales y otras",
-    xaxis_title="Año de colecta",
-    yaxis_title="Número de ejemplares",
-    legend_title="Colección"
-)
+    fig.update_layout(
+        title="Tendencia temporal de ejemplares en las 9 colecciones principales y otras",
+        xaxis_title="Año de colecta" if ancho == 1 else f"Año de colecta (intervalos de {ancho} años)",
+        yaxis_title="Número de ejemplares",
+        legend_title="Colección"
+    )
 
-fig.update_xaxes(rangeslider_visible=True)
+    fig.update_xaxes(rangeslider_visible=True)
 
-fig.show()
+    return fig
 
+
+@registrar_grafica("areas_colecciones")
+def construir_figura(snib_lazy_df):
+    return ajustar_a_presupuesto(
+        dibujar, contar(snib_lazy_df), "Áreas por colección", trazas="coleccion_agrupada"
+    )
+
+
+# -------------------------------------------------------
+# EJECUCIÓN
+# -------------------------------------------------------
+if __name__ == "__main__":
+    fig = construir_figura(cargar_datos())
+    fig.show()
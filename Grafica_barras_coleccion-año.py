@@ -4,95 +4,99 @@
 import polars as pl
 import plotly.express as px
 import plotly.io as pio
-import pandas as pd
 
-# -------------------------------
-# 1. Ruta del archivo
-# -------------------------------
-parquet_path = r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet"
-
-snib_lazy_df = pl.scan_parquet(parquet_path)
-
-print("Esquema del archivo:")
-print(snib_lazy_df.collect_schema())
-
-# -------------------------------
-# 2. Preparación de datos
-# -------------------------------
+from snib_cache_resultados import collect_en_cache
+from snib_ejecucion import ejecutar
+from snib_esquema import resumen_esquema
+from snib_figuras import ajustar_a_presupuesto
+from snib_graficas import cargar_datos, registrar_grafica
+from snib_top import top_n_con_otras
 
 # Valor de N (Top N colecciones por año)
 N = 10
 
-# Conteo de registros por año y colección
-conteos = (
-    snib_lazy_df
-    .select(["aniocolecta", "coleccion"])
-    .group_by(["aniocolecta", "coleccion"])
-    .agg(pl.len().alias("conteo"))
-)
-
-# Ranking por año
-ranked = conteos.with_columns(
-    pl.col("conteo")
-    .rank(method="dense", descending=True)
-    .over("aniocolecta")
-    .alias("rank")
-)
-
-# --- Parte A: Top N ---
-top_n = ranked.filter(pl.col("rank") <= N)
-
-# --- Parte B: Otras ---
-otras = (
-    ranked.filter(pl.col("rank") > N)
-    .group_by("aniocolecta")
-    .agg(pl.col("conteo").sum().alias("conteo"))
-    .with_columns(pl.lit("Otras").alias("coleccion"))
-)
-
-# Unir Top N + Otras
-top_n_clean = top_n.select(["aniocolecta", "coleccion", "conteo"])
-otras_clean = otras.select(["aniocolecta", "coleccion", "conteo"])
-
-final_df = (
-    pl.concat([top_n_clean, otras_clean])
-    .sort(["aniocolecta", "conteo"], descending=[False, True])
-    .collect()
-)
 
 # -------------------------------
-# 3. Orden para el gráfico
+# 1. Preparación de datos
 # -------------------------------
-years_in_descending_order = (
-    sorted(final_df["aniocolecta"].drop_nulls().unique().to_list(), reverse=True)
-)
+def contar(snib_lazy_df):
+
+    print("Esquema del archivo:")
+    print(resumen_esquema(snib_lazy_df.collect_schema()))
+
+    # Ejemplares por año y colección; el Top N se calcula al armar la figura,
+    # sobre los mismos intervalos de años que se grafican
+    return collect_en_cache(
+        snib_lazy_df
+        .select(["aniocolecta", "coleccion", "conteo"])
+        .filter(pl.col("aniocolecta").is_not_null() & pl.col("coleccion").is_not_null())
+        .group_by(["aniocolecta", "coleccion"])
+        .agg(pl.col("conteo").sum())
+        .sort(["aniocolecta", "coleccion"])
+    )
 
-collections_in_order = final_df["coleccion"].unique().to_list()
 
 # -------------------------------
-# 4. Gráfico Plotly
+# 2. Gráfico Plotly
 # -------------------------------
-fig = px.bar(
-    final_df,
-    x="aniocolecta",
-    y="conteo",
-    color="coleccion",
-    title=f'Top {N} Colecciones por año en el SNIB',
-    labels={
-        "aniocolecta": "Año de Colecta",
-        "conteo": "Número de Registros",
-        "coleccion": "Colección"
-    },
-    category_orders={
-        "aniocolecta": years_in_descending_order,
-        "coleccion": collections_in_order
-    },
-    color_discrete_sequence=px.colors.qualitative.Alphabet,
-    template="plotly_white"
-)
+# La figura se arma dentro del presupuesto de tamaño (snib_figuras): si el
+# rango completo de años no cabe, los años se agrupan en intervalos y el
+# Top N es por intervalo.
+def top_por_periodo(conteos_df):
+
+    # Top N de colecciones por año; el resto de cada año pasa a "Otras"
+    return ejecutar(
+        top_n_con_otras(conteos_df.lazy(), "coleccion", N, por=["aniocolecta"])
+        .sort(["aniocolecta", "conteo"], descending=[False, True])
+    )
+
+
+def dibujar(final_df, ancho):
+
+    # Orden para el gráfico
+    years_in_descending_order = (
+        sorted(final_df["aniocolecta"].drop_nulls().unique().to_list(), reverse=True)
+    )
+
+    collections_in_order = final_df["coleccion"].unique().to_list()
+
+    periodo = "año" if ancho == 1 else f"intervalo de {ancho} años"
+
+    return px.bar(
+        final_df,
+        x="aniocolecta",
+        y="conteo",
+        color="coleccion",
+        title=f'Top {N} Colecciones por {periodo} en el SNIB',
+        labels={
+            "aniocolecta": "Año de Colecta",
+            "conteo": "Número de Registros",
+            "coleccion": "Colección"
+        },
+        category_orders={
+            "aniocolecta": years_in_descending_order,
+            "coleccion": collections_in_order
+        },
+        color_discrete_sequence=px.colors.qualitative.Alphabet,
+        template="plotly_white"
+    )
+
+
+@registrar_grafica("barras_coleccion_anio")
+def construir_figura(snib_lazy_df):
+    return ajustar_a_presupuesto(
+        dibujar,
+        contar(snib_lazy_df),
+        "Top colecciones por año",
+        trazas="coleccion",
+        preparar=top_por_periodo,
+    )
+
 
 # -------------------------------
-# 5. Mostrar gráfico en navegador
+# 3. Mostrar gráfico en navegador
 # -------------------------------
-pio.renderers.default = "browser"
-fig.show()
+if __name__ == "__main__":
+    fig = construir_figura(cargar_datos())
+    pio.renderers.default = "browser"
+    fig.show()
@@ -3,76 +3,94 @@
 import polars as pl
 import plotly.express as px
 
-parquet_path = r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet"
+from snib_cache_resultados import collect_en_cache
+from snib_esquema import resumen_esquema
+from snib_figuras import ajustar_a_presupuesto, recortar_columnas
+from snib_graficas import cargar_datos, registrar_grafica
 
-snib_lazy_df = pl.scan_parquet(parquet_path)
 
+# Porcentaje de cada estatus dentro de su grupo biológico
+def contar(snib_lazy_df):
 
-# Mostrar el esquema del dataframe 
-print(snib_lazy_df.collect_schema())
+    # Mostrar el esquema del dataframe 
+    print(resumen_esquema(snib_lazy_df.collect_schema()))
 
-# Paso 1: Selección y filtrado inicial
-valores_a_excluir = ["NO APLICA", "", "NO DISPONIBLE", " "]
+    # Paso 1: Selección y filtrado inicial
+    ejemplares_especies_tax = (
+        snib_lazy_df.select(["estatustax", "grupobio", "conteo"])
+        .filter(pl.col("estatustax").is_not_null())
+    )
 
-ejemplares_especies_tax = (
-    snib_lazy_df.select(["estatustax", "grupobio"])
-    .filter(
-        pl.col("estatustax").is_not_null() &
-        ~pl.col("estatustax").is_in(valores_a_excluir)
+    # Paso 2: Agrupar y contar
+    df_resultado_lazy1 = ejemplares_especies_tax.group_by(
+        ["estatustax", "grupobio"]
+    ).agg(
+        pl.col("conteo").sum()
     )
-)
-
-# Paso 2: Agrupar y contar
-df_resultado_lazy1 = ejemplares_especies_tax.group_by(
-    ["estatustax", "grupobio"]
-).agg(
-    pl.len().alias("conteo")
-)
-
-# Paso 3: Calcular porcentaje directamente con window function
-df_con_porcentaje = df_resultado_lazy1.with_columns(
-    (
-        pl.col("conteo") / pl.col("conteo").sum().over("grupobio") * 100
-    ).alias("porcentaje_grupo")
-)
-
-# Paso 4: Materializar el resultado
-df_resultado_porcentaje = df_con_porcentaje.collect()
-
-# Mostrar resultado
-print("DataFrame con porcentaje por grupo taxonómico:")
-print(df_resultado_porcentaje)
-
-# Crear el gráfico de calor
-fig = px.density_heatmap(
-    df_resultado_porcentaje,
-    x="grupobio",
-    y="estatustax",
-    z="porcentaje_grupo",
-    histfunc="sum",
-    title=" Estatus taxonómico de grupos biológicos",
-   
-    labels={
-        "grupobio": "Grupo Biológico",
-        "estatustax": "Estatus",
-        "porcentaje_grupo": "Porcentaje"
-    }
-)
-
-# Editamos los títulos de ejes y centramos el título
-fig.update_layout(
-    xaxis_title="Grupo Biológico",
-    yaxis_title=" Estatus taxonómico",
-    title_x=0.5,
-    coloraxis_colorbar=dict(
-        title="Porcentaje"  
+
+    # Paso 3: Calcular porcentaje directamente con window function
+    df_con_porcentaje = df_resultado_lazy1.with_columns(
+        (
+            pl.col("conteo") / pl.col("conteo").sum().over("grupobio") * 100
+        ).alias("porcentaje_grupo")
     )
-)
 
-# Mostrar el gráfico 
+    # Paso 4: Materializar el resultado (o leerlo del cache si nada cambió)
+    df_resultado_porcentaje = collect_en_cache(df_con_porcentaje)
+
+    # Mostrar resultado
+    print("DataFrame con porcentaje por grupo taxonómico:")
+    print(df_resultado_porcentaje)
+
+    return df_resultado_porcentaje
+
+
+# Crear el gráfico de calor dentro del presupuesto de tamaño (snib_figuras);
+# no tiene eje de años, solo se compacta y se informa su tamaño
+def dibujar(df, ancho):
+
+    fig = px.density_heatmap(
+        df,
+        x="grupobio",
+        y="estatustax",
+        z="porcentaje_grupo",
+        histfunc="sum",
+        title=" Estatus taxonómico de grupos biológicos",
+       
+        labels={
+            "grupobio": "Grupo Biológico",
+            "estatustax": "Estatus",
+            "porcentaje_grupo": "Porcentaje"
+        }
+    )
+
+    # Editamos los títulos de ejes y centramos el título
+    fig.update_layout(
+        xaxis_title="Grupo Biológico",
+        yaxis_title=" Estatus taxonómico",
+        title_x=0.5,
+        coloraxis_colorbar=dict(
+            title="Porcentaje"  
+        )
+    )
 
-import plotly.io as pio
-pio.renderers.default = "browser"
+    return fig
 
-fig.show()
 
+@registrar_grafica("matriz_calor")
+def construir_figura(snib_lazy_df):
+    return ajustar_a_presupuesto(
+        dibujar,
+        recortar_columnas(contar(snib_lazy_df), ["grupobio", "estatustax", "porcentaje_grupo"]),
+        "Matriz de estatus taxonómico",
+        columna=None,
+    )
+
+
+# Mostrar el gráfico 
+if __name__ == "__main__":
+    import plotly.io as pio
+    pio.renderers.default = "browser"
+
+    fig = construir_figura(cargar_datos())
+    fig.show()
@@ -1,126 +1,99 @@
 # ============================================================
-# Sunburst Taxonómico 
+# Sunburst Taxonómico
 # ============================================================
 
+import os
+import sys
+
 import polars as pl
-import plotly.express as px
+import plotly.graph_objects as go
 import plotly.io as pio
-import pandas as pd
 
-# -------------------------------
-# 1. Ruta al archivo parquet
-# -------------------------------
-parquet_path = r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet"
+from snib_graficas import registrar_grafica
+from snib_taxonomia import NOMBRES_RANGOS, IndiceTaxonomico, construir_indice
 
-snib_lazy_df = pl.scan_parquet(parquet_path)
+# Solo los primeros niveles por defecto; para bajar a un grupo se indica su
+# ruta, por ejemplo SNIB_SUNBURST_RAIZ="Animalia/Chordata". El Dashboard3 lo
+# hace de forma interactiva.
+RAIZ = os.environ.get("SNIB_SUNBURST_RAIZ", "")
+PROFUNDIDAD = int(os.environ.get("SNIB_SUNBURST_PROFUNDIDAD", "3"))
 
-print("Mostrando primeras filas del archivo:")
-print(snib_lazy_df.head().collect())
 
-# -------------------------------
-# 2. Selección de columnas taxonómicas
-# -------------------------------
-grupobio_a_especie = (
-    snib_lazy_df.select([
-        "reinovalido",
-        "phylumdivisionvalido",
-        "clasevalida",
-        "ordenvalido",
-        "familiavalida",
-        "generovalido"
-    ])
-)
+@registrar_grafica("sunburst_taxonomia", cubo="taxones")
+def construir_figura(snib_lazy_df):
+    """Sunburst del cubo taxonómico ``snib_lazy_df`` (una agregación hasta género)."""
+    return dibujar(IndiceTaxonomico(construir_indice(snib_lazy_df)))
 
-# -------------------------------
-# 3. Filtrar registros vacíos
-# -------------------------------
-df_reducido = grupobio_a_especie.filter(
-    (pl.col("reinovalido").is_not_null()) & (pl.col("reinovalido") != "")
-)
 
-# -------------------------------
-# 4. Agrupar por nivel taxonómico
-# -------------------------------
-resultado_lazy = (
-    df_reducido
-    .group_by([
-        "reinovalido",
-        "phylumdivisionvalido",
-        "clasevalida",
-        "ordenvalido",
-        "familiavalida",
-        "generovalido"
-    ])
-    .agg(pl.len().alias("cantidad"))
-)
-
-# EXTRAER SOLO LOS 1000 GÉNEROS MÁS GRANDES
-top_generos = (
-    resultado_lazy
-    .sort("cantidad", descending=True)
-    .limit(1000)
-    .collect()
-)
-
-print("\nTop 1000 géneros procesados para el Sunburst:")
-print(top_generos.head())
+def dibujar(indice):
+    """Sunburst desde un índice taxonómico ya construido."""
 
-# -------------------------------
-# 5. Convertir Polars → Pandas para Plotly
-# -------------------------------
-df_pandas = top_generos.to_pandas()
+    # -------------------------------
+    # 1. Índice taxonómico
+    # -------------------------------
+    # Árbol de reino a género con el total de cada nodo (snib_taxonomia.py).
+    # No se recuenta nada aquí.
+    print("Reinos en el índice:")
+    print(indice.hijos())
+
+    # -------------------------------
+    # 2. Subárbol a mostrar
+    # -------------------------------
+    if RAIZ and indice.nodo(RAIZ).is_empty():
+        sys.exit(
+            f"No existe el nodo {RAIZ!r} (SNIB_SUNBURST_RAIZ) en el índice taxonómico; "
+            "use una ruta como 'Animalia/Chordata'"
+        )
+
+    nodos_df = indice.subarbol(RAIZ, PROFUNDIDAD)
+    if RAIZ:
+        # El nodo raíz se incluye como centro del sunburst
+        nodos_df = pl.concat([indice.nodo(RAIZ).with_columns(pl.lit("").alias("padre")), nodos_df])
+
+    print(f"\nNodos enviados al Sunburst: {nodos_df.height}")
+
+    # -------------------------------
+    # 3. Gráfico Sunburst
+    # -------------------------------
+    niveles = nodos_df["nivel"].unique().sort().to_list()
+
+    fig = go.Figure(go.Sunburst(
+        ids=nodos_df["id"].to_list(),
+        labels=nodos_df["etiqueta"].to_list(),
+        parents=nodos_df["padre"].to_list(),
+        values=nodos_df["total"].to_list(),
+        branchvalues="total",
+        customdata=[NOMBRES_RANGOS[nivel] for nivel in nodos_df["nivel"].to_list()],
+        textinfo="label+value",
+        hovertemplate=(
+            "<b>%{customdata}:</b> %{label}<br>"
+            "<b>Ruta:</b> %{id}<br>"
+            "<b>Cantidad:</b> %{value}<extra></extra>"
+        ),
+    ))
+
+    # Estética
+    fig.update_layout(
+        title=(
+            "Distribución taxonómica del SNIB de "
+            f"{NOMBRES_RANGOS[niveles[0]]} a {NOMBRES_RANGOS[niveles[-1]]}"
+            + (f" ({RAIZ})" if RAIZ else "")
+        ),
+        title_font_size=24,
+        width=1200,
+        height=850,
+        uniformtext=dict(minsize=12, mode="hide")
+    )
+
+    return fig
 
-# -------------------------------
-# 6. Gráfico Sunburst
-# -------------------------------
-fig = px.sunburst(
-    df_pandas,
-    path=[
-        "reinovalido",
-        "phylumdivisionvalido",
-        "clasevalida",
-        "ordenvalido",
-        "familiavalida",
-        "generovalido"
-    ],
-    values="cantidad",
-    title="Distribución taxonómica del SNIB de Reino a Género",
-    width=1200,
-    height=850,
-)
-
-# Personalización del hover (usando customdata)
-fig.update_traces(
-    textinfo="label+value",
-    hovertemplate=(
-        "<b>Reino:</b> %{customdata[0]}<br>"
-        "<b>Phylum/División:</b> %{customdata[1]}<br>"
-        "<b>Clase:</b> %{customdata[2]}<br>"
-        "<b>Orden:</b> %{customdata[3]}<br>"
-        "<b>Familia:</b> %{customdata[4]}<br>"
-        "<b>Género:</b> %{customdata[5]}<br>"
-        "<b>Cantidad:</b> %{value}<extra></extra>"
-    ),
-    customdata=df_pandas[
-        [
-            "reinovalido",
-            "phylumdivisionvalido",
-            "clasevalida",
-            "ordenvalido",
-            "familiavalida",
-            "generovalido"
-        ]
-    ].values
-)
-
-# Estética
-fig.update_layout(
-    title_font_size=24,
-    uniformtext=dict(minsize=12, mode="hide")
-)
 
 # -------------------------------
-# 7. Mostrar gráfico en navegador
+# 4. Mostrar gráfico en navegador
 # -------------------------------
-pio.renderers.default = "browser"
-fig.show()
\ No newline at end of file
+if __name__ == "__main__":
+    # Sobre el cubo limpio se usa el índice guardado: solo se reconstruye si
+    # el cubo cambió (snib_taxonomia.py)
+    fig = dibujar(IndiceTaxonomico.cargar())
+    pio.renderers.default = "browser"
+    fig.show()
@@ -0,0 +1,125 @@
+# ============================================================
+# Auditoria de los planes de consulta de las graficas y dashboards del SNIB.
+# Ejecuta cada script interceptando LazyFrame.collect: imprime el plan
+# optimizado (explain) de cada consulta que lee un archivo y marca las que
+# materializan filas sin agregar ni limitar (collect de columnas completas)
+# o que leen todas las columnas del archivo.
+#
+# Uso:
+#   python auditar_planes.py                 # todos los scripts
+#   python auditar_planes.py grafica_tax.py  # solo algunos
+#
+# Termina con codigo 1 si alguna consulta quedo marcada.
+# ============================================================
+
+import argparse
+import os
+import runpy
+import sys
+
+# Sin cache de resultados ni tablas compartidas: cada consulta debe ejecutarse,
+# aunque otra grafica de la misma corrida ya haya hecho la misma
+os.environ["SNIB_SIN_CACHE_RESULTADOS"] = "1"
+os.environ.pop("SNIB_DATOS_IPC", None)
+
+import plotly.basedatatypes
+import polars as pl
+
+SCRIPTS = [
+    "Dashboard1_coleccion_pais.py",
+    "Dashboard2_procedencia.py",
+    "Dashboard3_taxonomia.py",
+    "Grafica_areas-colecciones.py",
+    "Grafica_barras_coleccion-año.py",
+    "Grafica_matriz_calor_act.py",
+    "Grafica_sunburst-tax.py",
+    "grafica_H_proced_grpo-bio.py",
+    "grafica_tax.py",
+]
+
+# Nodos del plan que reducen las filas antes de materializarlas
+NODOS_REDUCCION = ("AGGREGATE", "GROUP_BY", "SLICE", "UNIQUE")
+
+
+def revisar_plan(plan):
+    """Advertencias sobre un plan optimizado que lee al menos un archivo."""
+    advertencias = []
+    reduce = any(nodo in plan for nodo in NODOS_REDUCCION)
+    if not reduce:
+        advertencias.append("collect sin agregar ni limitar: materializa las filas leidas")
+    # La proyeccion de un SCAN va en su propia linea ("DF [...]; PROJECT */n" es un
+    # DataFrame en memoria). El plan ya esta optimizado: si agrega o limita y aun
+    # lee todas las columnas, es que las usa todas (p. ej. el cubo taxonomico)
+    lee_todo = any(linea.strip().startswith("PROJECT */") for linea in plan.splitlines())
+    if lee_todo and not reduce:
+        advertencias.append("sin proyeccion: se leen todas las columnas del archivo")
+    return advertencias
+
+
+def auditar(scripts):
+    consultas = []
+    script_actual = [None]
+    collect_original = pl.LazyFrame.collect
+
+    def collect_auditado(self, *args, **kwargs):
+        # Las operaciones eager de DataFrame tambien pasan por aqui; solo
+        # interesan los planes que leen un archivo
+        if not kwargs.get("_eager"):
+            plan = self.explain()
+            if "SCAN" in plan:
+                consultas.append((script_actual[0], plan, revisar_plan(plan)))
+        return collect_original(self, *args, **kwargs)
+
+    pl.LazyFrame.collect = collect_auditado
+    plotly.basedatatypes.BaseFigure.show = lambda self, *args, **kwargs: None
+
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, directorio)
+    from snib_graficas import cargar_datos
+
+    fallidos = []
+    for script in scripts:
+        script_actual[0] = script
+        try:
+            namespace = runpy.run_path(os.path.join(directorio, script), run_name="__auditoria__")
+            # Las graficas solo consultan al construir su figura, sobre su cubo
+            if "construir_figura" in namespace:
+                grafica = namespace["construir_figura"]
+                grafica(cargar_datos(cubo=grafica.cubo))
+            # Los dashboards cargan sus datos en segundo plano
+            if "carga" in namespace:
+                namespace["carga"].esperar()
+        except Exception as error:
+            fallidos.append((script, error))
+
+    pl.LazyFrame.collect = collect_original
+    return consultas, fallidos
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Imprime y revisa los planes de consulta de cada script.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS)
+    args = parser.parse_args()
+
+    consultas, fallidos = auditar(args.scripts)
+
+    marcadas = 0
+    for script, plan, advertencias in consultas:
+        print("=" * 60)
+        print(script)
+        print("=" * 60)
+        print(plan)
+        for advertencia in advertencias:
+            print(f"⚠ {advertencia}")
+        marcadas += bool(advertencias)
+        print()
+
+    for script, error in fallidos:
+        print(f"✗ {script}: {error}")
+
+    print(f"✓ {len(consultas)} consultas revisadas, {marcadas} marcadas, {len(fallidos)} scripts con error")
+    sys.exit(1 if marcadas or fallidos else 0)
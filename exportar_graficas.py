@@ -0,0 +1,131 @@
+# ============================================================
+# Exportacion por lotes de las graficas del SNIB, sin navegador.
+# Cada cubo limpio que usan las graficas se carga una sola vez y se deja como
+# Arrow IPC sin comprimir; cada proceso del pool lo abre mapeado en memoria
+# (como snib_compartido), asi ninguna grafica vuelve a leer el parquet y todas
+# comparten las mismas paginas. Las graficas registradas (snib_graficas.py) se arman en paralelo y
+# se escriben como HTML o PNG en el directorio de salida, junto con un .log
+# con lo que imprimio cada una.
+#
+# Uso:
+#   python exportar_graficas.py --salida reportes/
+#   python exportar_graficas.py --salida reportes/ --formatos html png --procesos 4
+#   python exportar_graficas.py matriz_calor --salida reportes/
+#
+# PNG requiere kaleido (pip install kaleido).
+# ============================================================
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from snib_compartido import leer_mapeado
+from snib_ejecucion import ejecutar
+from snib_graficas import cargar_datos, cargar_graficas
+
+FORMATOS = ["html", "png"]
+
+# Cubos limpios ({cubo: DataFrame}) y registro de graficas de cada proceso del pool
+_datos = None
+_graficas = None
+
+
+def _iniciar(rutas_ipc):
+    global _datos, _graficas
+    _datos = {cubo: leer_mapeado(ruta) for cubo, ruta in rutas_ipc.items()}
+    _graficas = cargar_graficas()
+
+
+def exportar(nombre, salida, formatos):
+    """Arma la grafica ``nombre`` y la escribe en cada formato; devuelve (rutas, segundos)."""
+    inicio = time.perf_counter()
+    base = os.path.join(salida, nombre)
+
+    with open(f"{base}.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        fig = _graficas[nombre](_datos[_graficas[nombre].cubo].lazy())
+
+    rutas = []
+    for formato in formatos:
+        ruta = f"{base}.{formato}"
+        if formato == "html":
+            fig.write_html(ruta, include_plotlyjs="cdn")
+        else:
+            fig.write_image(ruta)
+        rutas.append(ruta)
+
+    return rutas, time.perf_counter() - inicio
+
+
+def exportar_todas(nombres, salida, formatos=("html",), procesos=None, fuente=None, fuente_taxones=None):
+    """Exporta las graficas ``nombres`` en paralelo; devuelve la lista de (nombre, error) fallidos."""
+    os.makedirs(salida, exist_ok=True)
+    fallidos = []
+    graficas = cargar_graficas()
+    fuentes = {"dimensiones": fuente, "taxones": fuente_taxones}
+
+    with tempfile.TemporaryDirectory(prefix="snib_exportar_") as directorio:
+
+        # Una sola lectura de cada cubo limpio para todas las graficas que lo usan
+        rutas_ipc = {}
+        for cubo in sorted({graficas[nombre].cubo for nombre in nombres}):
+            rutas_ipc[cubo] = os.path.join(directorio, f"{cubo}.arrow")
+            datos_df = ejecutar(cargar_datos(fuentes[cubo], cubo=cubo))
+            datos_df.write_ipc(rutas_ipc[cubo])
+            print(f"✓ Cubo limpio cargado: {cubo}, {datos_df.height} filas")
+            del datos_df
+
+        # spawn: Polars no es seguro con fork una vez que arranco sus hilos
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar,
+            initargs=(rutas_ipc,),
+        ) as pool:
+            futuros = {pool.submit(exportar, nombre, salida, list(formatos)): nombre for nombre in nombres}
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    rutas, segundos = futuro.result()
+                except Exception as error:
+                    fallidos.append((nombre, error))
+                    print(f"⚠ {nombre}: {error}")
+                    continue
+                print(f"✓ {nombre} ({segundos:.1f} s): {', '.join(rutas)}")
+
+    return fallidos
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    graficas = cargar_graficas()
+
+    parser = argparse.ArgumentParser(description="Exporta todas las graficas del SNIB a HTML/PNG en paralelo.")
+    parser.add_argument("nombres", nargs="*", default=sorted(graficas), help="Graficas a exportar (por defecto, todas)")
+    parser.add_argument("--salida", default=os.path.join(".", "data", "reportes"), help="Directorio de salida")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=["html"])
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--fuente", default=None, help="Parquet limpio de dimensiones (por defecto, el cubo limpio)")
+    parser.add_argument("--fuente-taxones", default=None,
+                        help="Parquet limpio taxonomico (por defecto, el cubo taxonomico limpio)")
+    args = parser.parse_args()
+
+    desconocidas = [nombre for nombre in args.nombres if nombre not in graficas]
+    if desconocidas:
+        parser.error(f"graficas no registradas: {', '.join(desconocidas)}")
+
+    inicio = time.perf_counter()
+    fallidos = exportar_todas(
+        args.nombres, args.salida, args.formatos, args.procesos, args.fuente, args.fuente_taxones
+    )
+
+    print(f"✓ {len(args.nombres) - len(fallidos)} de {len(args.nombres)} graficas en {args.salida} "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    sys.exit(1 if fallidos else 0)
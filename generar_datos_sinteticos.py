@@ -0,0 +1,197 @@
+# ============================================================
+# Export sintetico con la forma del SNIB para medir sin el archivo real.
+# Genera las columnas que usa el cubo (idejemplar, las seis dimensiones y los
+# seis rangos *valido) con cardinalidades y sesgos parecidos a los del export:
+# pocos valores concentran la mayoria de los registros (distribucion de Zipf),
+# los años recientes pesan mas, la taxonomia es un arbol consistente (cada
+# genero pertenece a una sola familia, cada familia a un solo orden, ...) y
+# hay una fraccion de centinelas ("NO APLICA", "", "null", año 0) como en el
+# export real.
+#
+# Los registros se generan por lotes con una fuente lazy de Polars y se
+# escriben en streaming, asi 100 millones de filas no necesitan caber en
+# memoria. Con la misma semilla el archivo es el mismo.
+#
+# Uso:
+#   python generar_datos_sinteticos.py 10_000_000 --salida ./data/sintetico_10M.parquet
+# ============================================================
+
+import argparse
+import os
+
+import numpy as np
+import polars as pl
+from polars.io.plugins import register_io_source
+
+from snib_cubo import DIMENSIONES, LLAVE_REGISTRO, RANGOS_TAXONOMICOS
+from snib_procedencia import PROCEDENCIA_ES
+
+# Filas por lote; fijo para que el resultado no dependa del motor
+FILAS_POR_LOTE = 1_000_000
+
+ANIO_MIN, ANIO_MAX = 1500, 2025
+
+# Fraccion de valores centinela en cada dimension
+PROPORCION_CENTINELAS = 0.03
+CENTINELAS = ["NO APLICA", "NO DISPONIBLE", ""]
+
+# Nodos por rango taxonomico, de reino a genero
+NODOS_POR_RANGO = [7, 120, 450, 1_900, 9_500, 60_000]
+REINOS = ["Animalia", "Plantae", "Fungi", "Chromista", "Protozoa", "Bacteria", "Archaea"]
+PREFIJOS_RANGO = ["", "Phylum", "Clase", "Orden", "Familia", "Genero"]
+
+# Fraccion de registros sin identificar hasta genero (rangos bajos vacios)
+PROPORCION_INCOMPLETOS = 0.05
+
+# Valores de cada dimension y exponente de Zipf de su distribucion
+PAISES = [
+    "MEXICO", "ESTADOS UNIDOS DE AMERICA", "GUATEMALA", "COSTA RICA", "BELICE",
+    "COLOMBIA", "BRASIL", "CANADA", "ESPAÑA", "ECUADOR",
+] + [f"PAIS {i:03d}" for i in range(190)]
+COLECCIONES = [f"COLECCION {i:04d}" for i in range(2_500)]
+GRUPOS_BIO = [
+    "Plantas", "Aves", "Invertebrados", "Hongos", "Mamíferos", "Reptiles",
+    "Peces", "Anfibios", "Bacterias", "Protoctistas", "Cromistas", "Arqueas",
+]
+ESTATUS_TAX = ["válido", "sinónimo", "no válido", "válido con reservas"]
+
+DIMENSIONES_CATEGORICAS = {
+    "coleccion": (COLECCIONES, 1.1),
+    "paiscoleccion": (PAISES, 1.8),
+    "grupobio": (GRUPOS_BIO, 1.2),
+    "procedenciaejemplar": (list(PROCEDENCIA_ES), 1.5),
+    "estatustax": (ESTATUS_TAX, 2.0),
+}
+
+ESQUEMA = pl.Schema(
+    {LLAVE_REGISTRO: pl.String}
+    | {columna: pl.String for columna in DIMENSIONES}
+    | {columna: pl.String for columna in RANGOS_TAXONOMICOS}
+)
+
+
+def _acumulada(pesos):
+    pesos = np.asarray(pesos, dtype=np.float64)
+    acumulada = np.cumsum(pesos / pesos.sum())
+    acumulada[-1] = 1.0
+    return acumulada
+
+
+def _zipf(cantidad, exponente):
+    return _acumulada(1.0 / np.arange(1, cantidad + 1) ** exponente)
+
+
+def _etiquetas_rango(nivel):
+    if nivel == 0:
+        return REINOS
+    return [f"{PREFIJOS_RANGO[nivel]}{i:05d}" for i in range(NODOS_POR_RANGO[nivel])]
+
+
+# Distribuciones acumuladas y etiquetas (con los centinelas al final)
+_ANIOS = _acumulada(np.exp((np.arange(ANIO_MIN, ANIO_MAX + 1) - ANIO_MAX) / 40.0))
+_CATEGORIAS = {
+    columna: (pl.Series(valores + CENTINELAS), _zipf(len(valores), exponente))
+    for columna, (valores, exponente) in DIMENSIONES_CATEGORICAS.items()
+}
+_GENEROS = _zipf(NODOS_POR_RANGO[-1], 1.05)
+_RANGOS = [pl.Series(_etiquetas_rango(nivel) + [""]) for nivel in range(len(RANGOS_TAXONOMICOS))]
+
+
+def _muestra(rng, acumulada, filas):
+    return np.searchsorted(acumulada, rng.random(filas))
+
+
+def _con_centinelas(rng, indices, cantidad_valores):
+    """Reemplaza una fraccion de los indices por alguno de los centinelas."""
+    es_centinela = rng.random(indices.size) < PROPORCION_CENTINELAS
+    centinela = cantidad_valores + rng.integers(0, len(CENTINELAS), indices.size)
+    return np.where(es_centinela, centinela, indices)
+
+
+def generar_lote(numero, filas, semilla=0):
+    """DataFrame con ``filas`` registros del lote ``numero`` (reproducible por semilla y lote)."""
+    rng = np.random.default_rng([semilla, numero])
+    columnas = {
+        LLAVE_REGISTRO: pl.int_range(
+            numero * FILAS_POR_LOTE, numero * FILAS_POR_LOTE + filas, eager=True
+        ).cast(pl.String).str.zfill(12).str.pad_start(13, "S"),
+    }
+
+    # Año como texto, con nulos, "null" y 0 como en el export
+    anio = pl.Series((ANIO_MIN + _muestra(rng, _ANIOS, filas)).astype(np.int16)).cast(pl.String)
+    tipo_anio = rng.random(filas)
+    columnas["aniocolecta"] = (
+        pl.select(
+            pl.when(pl.lit(tipo_anio < 0.03)).then(None)
+            .when(pl.lit(tipo_anio < 0.04)).then(pl.lit("null"))
+            .when(pl.lit(tipo_anio < 0.05)).then(pl.lit("0"))
+            .otherwise(pl.lit(anio))
+        ).to_series()
+    )
+
+    for columna, (etiquetas, acumulada) in _CATEGORIAS.items():
+        indices = _con_centinelas(rng, _muestra(rng, acumulada, filas), etiquetas.len() - len(CENTINELAS))
+        columnas[columna] = etiquetas.gather(indices)
+
+    # Taxonomia: se elige el genero y los rangos superiores salen de el por
+    # bloques, asi el arbol es consistente. Los incompletos se cortan en un
+    # rango al azar (de clase para abajo) y lo que sigue queda vacio.
+    genero = _muestra(rng, _GENEROS, filas)
+    corte = np.where(
+        rng.random(filas) < PROPORCION_INCOMPLETOS,
+        rng.integers(2, len(RANGOS_TAXONOMICOS), filas),
+        len(RANGOS_TAXONOMICOS),
+    )
+    for nivel, (columna, etiquetas) in enumerate(zip(RANGOS_TAXONOMICOS, _RANGOS)):
+        indices = genero * NODOS_POR_RANGO[nivel] // NODOS_POR_RANGO[-1]
+        columnas[columna] = etiquetas.gather(np.where(nivel < corte, indices, etiquetas.len() - 1))
+
+    return pl.DataFrame(columnas).select(ESQUEMA.names())
+
+
+def scan_sintetico(filas, semilla=0):
+    """LazyFrame con ``filas`` registros sinteticos que se generan al leerlo, lote por lote."""
+    lotes = -(-filas // FILAS_POR_LOTE)
+
+    def fuente(with_columns, predicate, n_rows, batch_size):
+        restantes = filas if n_rows is None else min(filas, n_rows)
+        for numero in range(lotes):
+            if restantes <= 0:
+                break
+            lote_df = generar_lote(numero, min(FILAS_POR_LOTE, restantes), semilla)
+            restantes -= lote_df.height
+            if with_columns is not None:
+                lote_df = lote_df.select(with_columns)
+            if predicate is not None:
+                lote_df = lote_df.filter(predicate)
+            yield lote_df
+
+    return register_io_source(fuente, schema=ESQUEMA, is_pure=True)
+
+
+def escribir_sintetico(filas, salida, semilla=0):
+    """Escribe el export sintetico en ``salida`` sin tenerlo completo en memoria."""
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    temporal = f"{salida}.{os.getpid()}.tmp"
+    scan_sintetico(filas, semilla).sink_parquet(temporal, compression="zstd")
+    os.replace(temporal, salida)
+    return salida
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un export sintetico con la forma del SNIB.")
+    parser.add_argument("filas", type=lambda valor: int(valor.replace("_", "")), help="Numero de registros")
+    parser.add_argument("--salida", default=None, help="Ruta del parquet (por defecto ./data/sintetico_<filas>.parquet)")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    salida = args.salida or os.path.join(".", "data", f"sintetico_{args.filas}.parquet")
+    escribir_sintetico(args.filas, salida, args.semilla)
+
+    print(f"✓ Export sintetico escrito en: {salida}")
+    print(f"✓ Registros: {pl.scan_parquet(salida).select(pl.len()).collect().item()}")
+    print(f"✓ Tamaño: {os.path.getsize(salida) / 1024 / 1024:.1f} MB")
@@ -3,70 +3,74 @@
 import polars as pl
 import plotly.express as px
 
-SNIB_DATA_PARQUET = "./data/SNIBEjemplares_20250803_233426.parquet"
+from snib_cache_resultados import collect_en_cache
+from snib_esquema import resumen_esquema
+from snib_graficas import cargar_datos, registrar_grafica
 
-snib_lazy_df = pl.scan_parquet(SNIB_DATA_PARQUET)
 
-# Mostrar el esquema del dataframe (opcional, para inspección)
-print(snib_lazy_df.collect_schema())
+@registrar_grafica("estatus_taxonomico")
+def construir_figura(snib_lazy_df):
 
-# Paso 1: Selección y filtrado inicial
-valores_a_excluir = ["NO APLICA", "", "NO DISPONIBLE", " "]
+    # Mostrar el esquema del dataframe (opcional, para inspección)
+    print(resumen_esquema(snib_lazy_df.collect_schema()))
 
-ejemplares_especies_tax = (
-    snib_lazy_df.select(["estatustax", "grupobio"])
-    .filter(
-        pl.col("estatustax").is_not_null() &
-        ~pl.col("estatustax").is_in(valores_a_excluir)
+    # Paso 1: Selección y filtrado inicial
+    ejemplares_especies_tax = (
+        snib_lazy_df.select(["estatustax", "grupobio", "conteo"])
+        .filter(pl.col("estatustax").is_not_null())
     )
-)
-
-# Paso 2: Agrupar y contar
-df_resultado_lazy1 = ejemplares_especies_tax.group_by(
-    ["estatustax", "grupobio"]
-).agg(
-    pl.len().alias("conteo")
-)
-
-# Paso 3: Calcular porcentaje directamente con window function
-df_con_porcentaje = df_resultado_lazy1.with_columns(
-    (
-        pl.col("conteo") / pl.col("conteo").sum().over("grupobio") * 100
-    ).alias("porcentaje_grupo")
-)
-
-# Paso 4: Materializar el resultado
-df_resultado_porcentaje = df_con_porcentaje.collect()
-
-# Mostrar resultado
-print("DataFrame con porcentaje por grupo taxonómico:")
-print(df_resultado_porcentaje)
-
-# Crear el gráfico de calor
-fig = px.density_heatmap(
-    df_resultado_porcentaje,
-    x="grupobio",
-    y="estatustax",
-    z="porcentaje_grupo",
-    histfunc="sum",
-    title=" Estatus taxonómico de grupos biológicos",
-    
-    labels={
-        "grupobio": "Grupo Biológico",
-        "estatustax": "Estatus",
-        "porcentaje_grupo": "Porcentaje"
-    }
-)
-
-# Editamos los títulos de ejes y centramos el título
-fig.update_layout(
-    xaxis_title="Grupo Biológico",
-    yaxis_title=" Estatus taxonómico",
-    title_x=0.5,
-    coloraxis_colorbar=dict(
-        title="Porcentaje"   
+
+    # Paso 2: Agrupar y contar
+    df_resultado_lazy1 = ejemplares_especies_tax.group_by(
+        ["estatustax", "grupobio"]
+    ).agg(
+        pl.col("conteo").sum()
+    )
+
+    # Paso 3: Calcular porcentaje directamente con window function
+    df_con_porcentaje = df_resultado_lazy1.with_columns(
+        (
+            pl.col("conteo") / pl.col("conteo").sum().over("grupobio") * 100
+        ).alias("porcentaje_grupo")
+    )
+
+    # Paso 4: Materializar el resultado (o leerlo del cache si nada cambió)
+    df_resultado_porcentaje = collect_en_cache(df_con_porcentaje)
+
+    # Mostrar resultado
+    print("DataFrame con porcentaje por grupo taxonómico:")
+    print(df_resultado_porcentaje)
+
+    # Crear el gráfico de calor
+    fig = px.density_heatmap(
+        df_resultado_porcentaje,
+        x="grupobio",
+        y="estatustax",
+        z="porcentaje_grupo",
+        histfunc="sum",
+        title=" Estatus taxonómico de grupos biológicos",
+
+        labels={
+            "grupobio": "Grupo Biológico",
+            "estatustax": "Estatus",
+            "porcentaje_grupo": "Porcentaje"
+        }
+    )
+
+    # Editamos los títulos de ejes y centramos el título
+    fig.update_layout(
+        xaxis_title="Grupo Biológico",
+        yaxis_title=" Estatus taxonómico",
+        title_x=0.5,
+        coloraxis_colorbar=dict(
+            title="Porcentaje"   
+        )
     )
-)
+
+    return fig
+
 
 # Mostrar el gráfico (en consola, esto podría abrir un navegador o depender del entorno)
-fig.show()
+if __name__ == "__main__":
+    fig = construir_figura(cargar_datos())
+    fig.show()
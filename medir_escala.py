@@ -0,0 +1,223 @@
+# ============================================================
+# Mediciones de escala de los pipelines del SNIB sobre datos sinteticos.
+# Para cada tamaño (1M y 10M registros por defecto) genera el export
+# sintetico si no existe (generar_datos_sinteticos.py) y, en un proceso aparte
+# con las rutas de ese tamaño, mide:
+#   - la construccion de los cubos, de los cubos limpios y del indice taxonomico
+#   - cada grafica registrada (snib_graficas.py), sin cache de resultados
+#   - la carga de cada dashboard y sus callbacks con entradas representativas
+#     (sin cache de figuras)
+# Los tiempos (mejor de varias corridas) se imprimen como tabla y se guardan en
+# JSON; con --base se comparan contra una medicion anterior y se marcan las
+# etapas que empeoraron mas del umbral.
+#
+# Uso:
+#   python medir_escala.py                                  # 1M y 10M
+#   python medir_escala.py --filas 1000000 --resultados medicion.json
+#   python medir_escala.py --filas 1000000 --base medicion.json
+# ============================================================
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TAMANOS = [1_000_000, 10_000_000]
+
+DASHBOARDS = ["Dashboard1_coleccion_pais", "Dashboard2_procedencia", "Dashboard3_taxonomia"]
+
+# Una etapa se marca como regresion si tarda mas de umbral x la base
+UMBRAL_REGRESION = 1.25
+
+
+# ============================================================
+# MEDICION DE UN TAMAÑO (proceso aparte)
+# ============================================================
+# Las rutas del cubo y sus derivados se leen de variables de entorno al
+# importar los modulos, por eso cada tamaño se mide en su propio proceso.
+
+def cronometrar(funcion, repeticiones=1, antes=None):
+    """Mejor tiempo en ms de ``funcion()``; ``antes()`` corre fuera del cronometro en cada repeticion."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        if antes is not None:
+            antes()
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcion()
+            mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def callbacks_dashboard(nombre, modulo):
+    """(nombre, callback con cache, argumentos) representativos de cada dashboard."""
+    if nombre == "Dashboard1_coleccion_pais":
+        opciones = modulo.carga.resultado["opciones"]
+        anio = opciones["anios"][-1]["value"]
+        pais = opciones["paises"][min(1, len(opciones["paises"]) - 1)]["value"]
+        return [
+            ("todos", modulo.update_charts, ("Todos", "Todos", True)),
+            ("anio_pais", modulo.update_charts, (anio, pais, True)),
+        ]
+    if nombre == "Dashboard2_procedencia":
+        opciones = modulo.carga.resultado["opciones"]
+        return [("anio_pais", modulo.update_graphs, (opciones["anios"][-1], opciones["paises"][0], True))]
+    if nombre == "Dashboard3_taxonomia":
+        reino = modulo.carga.resultado["indice"].hijos()["id"][0]
+        return [("bajar_reino", modulo.figura_nodo, (reino,))]
+    return []
+
+
+def medir_tamano(repeticiones):
+    from snib_cache_resultados import invalidar
+    from snib_cubo import CUBO_PATH, PARQUET_SNIB, escribir_cubo
+    from snib_graficas import cargar_datos, cargar_graficas
+    from snib_limpieza import escribir_limpio
+    from snib_taxonomia import escribir_indice
+
+    resultados = []
+
+    def registrar(etapa, nombre, ms):
+        resultados.append({"etapa": etapa, "nombre": nombre, "ms": round(ms, 2)})
+        print(f"  {etapa:10} {nombre:36} {ms:10.1f} ms", file=sys.stderr)
+
+    registrar("datos", "cubo", cronometrar(lambda: escribir_cubo(PARQUET_SNIB, CUBO_PATH)))
+    registrar("datos", "cubo_limpio", cronometrar(escribir_limpio))
+    registrar("datos", "indice_taxonomico", cronometrar(escribir_indice))
+
+    for nombre, funcion in sorted(cargar_graficas().items()):
+        registrar(
+            "grafica", nombre,
+            cronometrar(lambda: funcion(cargar_datos(cubo=funcion.cubo)), repeticiones, invalidar),
+        )
+
+    for nombre in DASHBOARDS:
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            modulo = importlib.import_module(nombre)
+            if hasattr(modulo, "carga"):
+                modulo.carga.esperar()
+        registrar("carga", nombre, (time.perf_counter() - inicio) * 1000)
+
+        for caso, callback, argumentos in callbacks_dashboard(nombre, modulo):
+            ms = cronometrar(lambda: callback(*argumentos), repeticiones, callback.cache_clear)
+            registrar("callback", f"{nombre}.{caso}", ms)
+
+    return resultados
+
+
+# ============================================================
+# ORQUESTACION
+# ============================================================
+
+def medir(filas, directorio, repeticiones, semilla=0):
+    """Genera (si falta) el export de ``filas`` registros y lo mide en un proceso aparte."""
+    from generar_datos_sinteticos import escribir_sintetico
+
+    directorio_tamano = os.path.join(directorio, f"{filas}")
+    export = os.path.join(directorio_tamano, "SNIBEjemplares.parquet")
+    if not os.path.exists(export):
+        inicio = time.perf_counter()
+        escribir_sintetico(filas, export, semilla)
+        print(f"✓ Export sintetico de {filas} filas generado ({time.perf_counter() - inicio:.1f} s)")
+
+    entorno = {
+        clave: valor for clave, valor in os.environ.items()
+        if clave not in ("SNIB_CUBO_LIMPIO", "SNIB_TAXONES_LIMPIO", "SNIB_DICCIONARIO", "SNIB_TAXONOMIA", "SNIB_DATOS_IPC")
+    }
+    entorno.update({
+        "SNIB_PARQUET": export,
+        "SNIB_CUBO": os.path.join(directorio_tamano, "cubo.parquet"),
+        "SNIB_OPCIONES": os.path.join(directorio_tamano, "opciones"),
+        "SNIB_CACHE_RESULTADOS": tempfile.mkdtemp(prefix="snib_escala_"),
+    })
+
+    salida = os.path.join(directorio_tamano, "tiempos.json")
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--medir", salida, "--repeticiones", str(repeticiones)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=entorno, check=True,
+    )
+    with open(salida, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def imprimir(mediciones, base=None, umbral=UMBRAL_REGRESION):
+    """Tabla etapa x tamaño; con ``base`` marca las regresiones. Devuelve cuantas hubo."""
+    tamanos = list(mediciones)
+    filas = list(dict.fromkeys((r["etapa"], r["nombre"]) for t in tamanos for r in mediciones[t]))
+    tiempos = {(t, r["etapa"], r["nombre"]): r["ms"] for t in tamanos for r in mediciones[t]}
+    tiempos_base = {}
+    if base is not None:
+        tiempos_base = {
+            (t, r["etapa"], r["nombre"]): r["ms"] for t in base["tamanos"] for r in base["tamanos"][t]
+        }
+
+    print(f"{'etapa':10} {'nombre':36}" + "".join(f"{t + ' filas':>18}" for t in tamanos))
+    regresiones = 0
+    for etapa, nombre in filas:
+        celdas = ""
+        for t in tamanos:
+            ms = tiempos.get((t, etapa, nombre))
+            anterior = tiempos_base.get((t, etapa, nombre))
+            marca = " "
+            if ms is not None and anterior and ms > anterior * umbral:
+                marca = "⚠"
+                regresiones += 1
+            celdas += f"{'-' if ms is None else f'{ms:.1f} ms':>17}{marca}"
+        print(f"{etapa:10} {nombre:36}{celdas}")
+    return regresiones
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide los pipelines del SNIB sobre datos sinteticos de varios tamaños.")
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--directorio", default=os.path.join(".", "data", "escala"),
+                        help="Donde se guardan los exports y cubos sinteticos")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--resultados", default=None, help="JSON donde guardar los tiempos")
+    parser.add_argument("--base", default=None, help="JSON de una medicion anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION)
+    parser.add_argument("--medir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Proceso hijo: mide el tamaño configurado por el entorno
+    if args.medir:
+        resultados = medir_tamano(args.repeticiones)
+        with open(args.medir, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        sys.exit(0)
+
+    import polars as pl
+
+    mediciones = {}
+    for filas in args.filas:
+        print(f"== {filas} filas ==")
+        mediciones[str(filas)] = medir(filas, args.directorio, args.repeticiones, args.semilla)
+
+    base = None
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    print()
+    regresiones = imprimir(mediciones, base, args.umbral)
+
+    if args.resultados:
+        with open(args.resultados, "w", encoding="utf-8") as f:
+            json.dump({"polars": pl.__version__, "tamanos": mediciones}, f, ensure_ascii=False, indent=2)
+        print(f"✓ Tiempos guardados en: {args.resultados}")
+
+    if base is not None:
+        print(f"{'⚠' if regresiones else '✓'} {regresiones} etapas mas lentas que {args.umbral}x la base")
+    sys.exit(1 if regresiones else 0)
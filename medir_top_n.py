@@ -0,0 +1,181 @@
+# ============================================================
+# Comparacion del operador top_n_con_otras (snib_top) contra las tres
+# variantes de "top N + Otras" que tenian las graficas:
+#   - rango denso por año (Dashboard1)
+#   - concat de una rama con el top y otra con el resto (Grafica_barras)
+#   - collect del top aparte y despues is_in (Grafica_areas)
+# Para cada caso verifica que el resultado sea el mismo, cuenta los scans del
+# plan optimizado y mide el tiempo (mejor de varias corridas).
+#
+# Uso:
+#   python medir_top_n.py [--repeticiones 5]
+# ============================================================
+
+import argparse
+import time
+
+import polars as pl
+
+from snib_ejecucion import ejecutar
+from snib_limpieza import cargar_limpio
+from snib_top import top_n_con_otras
+
+N = 10
+
+
+# ============================================================
+# VARIANTES ANTERIORES
+# ============================================================
+
+def rango_denso(lazy_df):
+    """Dashboard1: rango denso de cada par pais-coleccion dentro de su año."""
+    tipo = lazy_df.collect_schema()["coleccion"]
+    tipo = pl.Enum(list(tipo.categories) + ["Otras"])
+    return (
+        lazy_df
+        .group_by(["aniocolecta", "paiscoleccion", "coleccion"])
+        .agg(pl.col("conteo").sum())
+        .with_columns(pl.col("conteo").rank("dense", descending=True).over("aniocolecta").alias("rank"))
+        .with_columns(
+            pl.when(pl.col("rank") <= N)
+            .then(pl.col("coleccion").cast(tipo))
+            .otherwise(pl.lit("Otras", dtype=tipo))
+            .alias("coleccion_agrupada")
+        )
+        .group_by(["aniocolecta", "paiscoleccion", "coleccion_agrupada"])
+        .agg(pl.col("conteo").sum())
+    )
+
+
+def concat_dos_ramas(lazy_df):
+    """Grafica_barras: una rama con el top N y otra con el resto sumado por año."""
+    tipo = lazy_df.collect_schema()["coleccion"]
+    tipo = pl.Enum(list(tipo.categories) + ["Otras"])
+    ranked = (
+        lazy_df
+        .group_by(["aniocolecta", "coleccion"])
+        .agg(pl.col("conteo").sum())
+        .with_columns(pl.col("conteo").rank("dense", descending=True).over("aniocolecta").alias("rank"))
+    )
+    top_n = ranked.filter(pl.col("rank") <= N).select(
+        "aniocolecta", pl.col("coleccion").cast(tipo), "conteo"
+    )
+    otras = (
+        ranked.filter(pl.col("rank") > N)
+        .group_by("aniocolecta")
+        .agg(pl.col("conteo").sum())
+        .select("aniocolecta", pl.lit("Otras", dtype=tipo).alias("coleccion"), "conteo")
+    )
+    return pl.concat([top_n, otras])
+
+
+def collect_e_is_in(lazy_df):
+    """Grafica_areas: primero se materializa el top global, despues se filtra con is_in."""
+    tipo = lazy_df.collect_schema()["coleccion"]
+    tipo = pl.Enum(list(tipo.categories) + ["otras"])
+    conteo_df = ejecutar(lazy_df.group_by(["aniocolecta", "coleccion"]).agg(pl.col("conteo").sum()))
+    top = (
+        conteo_df.group_by("coleccion")
+        .agg(pl.col("conteo").sum().alias("total"))
+        .sort("total", descending=True)
+        .limit(9)["coleccion"]
+        .to_list()
+    )
+    return (
+        conteo_df.lazy()
+        .with_columns(
+            pl.when(pl.col("coleccion").is_in(top))
+            .then(pl.col("coleccion").cast(tipo))
+            .otherwise(pl.lit("otras", dtype=tipo))
+            .alias("coleccion_agrupada")
+        )
+        .group_by(["aniocolecta", "coleccion_agrupada"])
+        .agg(pl.col("conteo").sum())
+    )
+
+
+def casos(lazy_df):
+    """(nombre, variante anterior, mismo calculo con top_n_con_otras, scans previos).
+
+    Los scans previos son los que la variante anterior ejecuta al construir su
+    plan (collect_e_is_in materializa el conteo antes de devolver el plan).
+    """
+    return [
+        (
+            "Dashboard1 (rango denso)",
+            lambda: rango_denso(lazy_df),
+            lambda: top_n_con_otras(
+                lazy_df, "coleccion", N, por=["aniocolecta"], unidad=["paiscoleccion"],
+                alias="coleccion_agrupada",
+            ),
+            0,
+        ),
+        (
+            "Grafica_barras (concat)",
+            lambda: concat_dos_ramas(lazy_df),
+            lambda: top_n_con_otras(lazy_df, "coleccion", N, por=["aniocolecta"]),
+            0,
+        ),
+        (
+            "Grafica_areas (collect + is_in)",
+            lambda: collect_e_is_in(lazy_df),
+            lambda: top_n_con_otras(
+                lazy_df, "coleccion", 9, conservar=["aniocolecta"], etiqueta="otras",
+                alias="coleccion_agrupada",
+            ),
+            1,
+        ),
+    ]
+
+
+# ============================================================
+# MEDICION
+# ============================================================
+
+def medir(construir, repeticiones):
+    """Mejor tiempo en ms de construir y ejecutar el plan, y el resultado."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado_df = ejecutar(construir())
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, resultado_df
+
+
+def contar_scans(construir):
+    """Lecturas del archivo en el plan optimizado."""
+    return construir().explain().count("SCAN [")
+
+
+def iguales(a_df, b_df):
+    columnas = a_df.columns
+    orden = columnas[:-1]
+    a_df = a_df.with_columns(pl.col(pl.Enum).cast(pl.Utf8)).sort(orden)
+    b_df = b_df.select(columnas).with_columns(pl.col(pl.Enum).cast(pl.Utf8)).sort(orden)
+    return a_df.equals(b_df)
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara top_n_con_otras con las variantes anteriores.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    snib_lazy_df = cargar_limpio().filter(
+        pl.col("aniocolecta").is_not_null()
+        & pl.col("coleccion").is_not_null()
+        & pl.col("paiscoleccion").is_not_null()
+    )
+
+    print(f"{'caso':34} {'anterior ms':>12} {'operador ms':>12} {'scans':>7}  igual")
+    for nombre, anterior, operador, scans_previos in casos(snib_lazy_df):
+        ms_anterior, anterior_df = medir(anterior, args.repeticiones)
+        ms_operador, operador_df = medir(operador, args.repeticiones)
+        scans = f"{contar_scans(anterior) + scans_previos}/{contar_scans(operador)}"
+        print(
+            f"{nombre:34} {ms_anterior:12.1f} {ms_operador:12.1f} {scans:>7}  "
+            f"{'si' if iguales(anterior_df, operador_df) else 'NO'}"
+        )
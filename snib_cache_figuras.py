@@ -0,0 +1,89 @@
+# ============================================================
+# Cache de figuras para los dashboards del SNIB.
+# Memoriza el resultado de un callback de Dash por sus entradas (año, país,
+# ...) con tamaño acotado y desalojo LRU. Se guardan las figuras ya
+# convertidas a JSON de Plotly, asi una combinacion repetida no vuelve a
+# pasar por plotly.express.
+#
+# El tamaño se ajusta con la variable de entorno SNIB_CACHE_FIGURAS y los
+# contadores de aciertos/fallos se consultan en la ruta /cache-figuras.
+# Con SNIB_PERFIL cada llamada se registra como la etapa callback:<funcion>,
+# y la latencia por fase de cada callback se publica con snib_metricas.py.
+# ============================================================
+
+import functools
+import os
+import threading
+import time
+
+from flask import jsonify
+
+from snib_metricas import iniciar_fases, observar_generacion, observar_llamada
+from snib_perfil import etapa
+
+TAMANO_CACHE = int(os.environ.get("SNIB_CACHE_FIGURAS", "256"))
+
+# Marca, por hilo, si la ultima llamada genero las figuras (fallo del cache)
+_local = threading.local()
+
+
+def cache_figuras(maxsize=TAMANO_CACHE):
+    """Decorador para callbacks que devuelven una o varias figuras de Plotly.
+
+    Las entradas del callback son la llave del cache. El callback envuelto
+    devuelve los diccionarios JSON guardados; no deben modificarse.
+    """
+    def decorador(funcion):
+
+        @functools.lru_cache(maxsize=maxsize)
+        def generar(*args):
+            _local.generado = True
+            iniciar_fases()
+            inicio = time.perf_counter()
+            figuras = funcion(*args)
+            construidas = time.perf_counter()
+            if isinstance(figuras, (tuple, list)):
+                resultado = tuple(fig.to_plotly_json() for fig in figuras)
+            else:
+                resultado = figuras.to_plotly_json()
+            observar_generacion(funcion.__name__, args, construidas - inicio, time.perf_counter() - construidas)
+            return resultado
+
+        @functools.wraps(funcion)
+        def envoltura(*args):
+            with etapa(f"callback:{funcion.__name__}", argumentos=list(args)) as registro:
+                _local.generado = False
+                inicio = time.perf_counter()
+                resultado = generar(*args)
+                observar_llamada(funcion.__name__, time.perf_counter() - inicio, not _local.generado)
+                registro["en_cache"] = not _local.generado
+                return resultado
+
+        envoltura.cache_info = generar.cache_info
+        envoltura.cache_clear = generar.cache_clear
+        return envoltura
+
+    return decorador
+
+
+def estadisticas(*callbacks):
+    """Aciertos, fallos y ocupacion del cache de cada callback."""
+    resultado = {}
+    for callback in callbacks:
+        info = callback.cache_info()
+        consultas = info.hits + info.misses
+        resultado[callback.__name__] = {
+            "aciertos": info.hits,
+            "fallos": info.misses,
+            "tasa_aciertos": info.hits / consultas if consultas else 0.0,
+            "tamano": info.currsize,
+            "tamano_maximo": info.maxsize,
+        }
+    return resultado
+
+
+def exponer_estadisticas(app, *callbacks, ruta="/cache-figuras"):
+    """Publica las estadisticas del cache como JSON en el servidor Flask de la app."""
+    @app.server.route(ruta)
+    def _estadisticas_cache():
+        return jsonify(estadisticas(*callbacks))
@@ -0,0 +1,129 @@
+# ============================================================
+# Cache en disco de resultados para las graficas del SNIB.
+# Cada consulta se identifica por su plan (LazyFrame.explain) y por la huella
+# de los archivos que lee segun ese plan (ruta, tamaño, fecha de modificacion y
+# hash del footer). Si ninguno cambio, el resultado se lee de un archivo Arrow
+# IPC en lugar de volver a calcularse. Las consultas sobre DataFrames en
+# memoria no tienen un archivo que identifique sus datos: se ejecutan sin cache.
+# Con SNIB_SIN_CACHE_RESULTADOS=1 todas las consultas se ejecutan (auditorias).
+#
+# Uso:
+#   resultado_df = collect_en_cache(lazy_df)
+#   python snib_cache_resultados.py --listar
+#   python snib_cache_resultados.py --invalidar
+# ============================================================
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import struct
+
+import polars as pl
+
+from snib_ejecucion import ejecutar
+
+DIRECTORIO_CACHE = os.environ.get("SNIB_CACHE_RESULTADOS", os.path.join(".", "data", "cache"))
+SIN_CACHE = os.environ.get("SNIB_SIN_CACHE_RESULTADOS", "0") == "1"
+
+
+def huella_parquet(ruta):
+    """Identifica una version del archivo sin leerlo completo.
+
+    Usa la ruta, el tamaño, la fecha de modificacion y el hash del footer del
+    parquet (los metadatos con el esquema y las estadisticas de cada row group).
+    """
+    info = os.stat(ruta)
+    huella = hashlib.sha256(f"{os.path.abspath(ruta)}|{info.st_size}|{info.st_mtime_ns}".encode())
+
+    with open(ruta, "rb") as f:
+        f.seek(-8, os.SEEK_END)
+        largo_footer, magia = struct.unpack("<I4s", f.read(8))
+        if magia == b"PAR1" and largo_footer + 8 <= info.st_size:
+            f.seek(-(largo_footer + 8), os.SEEK_END)
+            huella.update(f.read(largo_footer))
+
+    return huella.hexdigest()
+
+
+def fuentes_del_plan(plan):
+    """Archivos que lee el plan, o None si tambien lee datos que no estan en un archivo.
+
+    None cuando el plan incluye un DataFrame en memoria, una fuente de Python o
+    una lista de archivos abreviada ("... n other sources").
+    """
+    if re.search(r"^\s*DF \[", plan, re.MULTILINE) or "PYTHON SCAN" in plan:
+        return None
+    fuentes = []
+    for lista in re.findall(r"SCAN \[([^\]]*)\]", plan):
+        if "other sources" in lista:
+            return None
+        fuentes.extend(lista.split(", "))
+    if not fuentes or not all(os.path.isfile(fuente) for fuente in fuentes):
+        return None
+    return sorted(set(fuentes))
+
+
+def llave_consulta(plan, fuentes):
+    """Llave del cache: plan sin optimizar + huella de cada fuente + version de Polars."""
+    llave = hashlib.sha256()
+    llave.update(pl.__version__.encode())
+    llave.update(plan.encode())
+    for fuente in fuentes:
+        llave.update(huella_parquet(fuente).encode())
+    return llave.hexdigest()
+
+
+def collect_en_cache(lazy_df):
+    """Como ``lazy_df.collect()``, pero reutiliza el resultado si la consulta y sus archivos no cambiaron."""
+    if SIN_CACHE:
+        return ejecutar(lazy_df)
+    plan = lazy_df.explain(optimized=False)
+    fuentes = fuentes_del_plan(plan)
+    if fuentes is None:
+        return ejecutar(lazy_df)
+
+    ruta = os.path.join(DIRECTORIO_CACHE, llave_consulta(plan, fuentes) + ".arrow")
+
+    if os.path.exists(ruta):
+        return pl.read_ipc(ruta)
+
+    resultado_df = ejecutar(lazy_df)
+
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    resultado_df.write_ipc(temporal, compression="zstd")
+    os.replace(temporal, ruta)
+
+    return resultado_df
+
+
+def invalidar():
+    """Borra todos los resultados guardados."""
+    if os.path.isdir(DIRECTORIO_CACHE):
+        shutil.rmtree(DIRECTORIO_CACHE)
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Administra el cache de resultados de las graficas.")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--listar", action="store_true", help="Muestra los resultados guardados")
+    grupo.add_argument("--invalidar", action="store_true", help="Borra todos los resultados guardados")
+    args = parser.parse_args()
+
+    if args.invalidar:
+        invalidar()
+        print(f"✓ Cache borrado: {DIRECTORIO_CACHE}")
+    else:
+        archivos = sorted(os.listdir(DIRECTORIO_CACHE)) if os.path.isdir(DIRECTORIO_CACHE) else []
+        total = 0
+        for archivo in archivos:
+            tamano = os.path.getsize(os.path.join(DIRECTORIO_CACHE, archivo))
+            total += tamano
+            print(f"{archivo}  {tamano / 1024:.1f} KB")
+        print(f"✓ {len(archivos)} resultados, {total / 1024 / 1024:.1f} MB en {DIRECTORIO_CACHE}")
@@ -0,0 +1,98 @@
+# ============================================================
+# Carga diferida de datos para los dashboards del SNIB.
+# La app de Dash se crea y sirve el layout de inmediato; el procesamiento
+# pesado corre en un hilo en segundo plano. Mientras tanto las opciones de
+# los dropdowns salen de un archivo JSON guardado en la carga anterior y un
+# indicador avisa que los datos aun no estan listos.
+# ============================================================
+
+import json
+import os
+import threading
+import traceback
+
+from dash import dcc, html
+
+from snib_compartido import FUENTES_DIMENSIONES, vigente
+from snib_perfil import etapa
+
+DIRECTORIO_OPCIONES = os.environ.get("SNIB_OPCIONES", os.path.join(".", "data", "opciones"))
+
+
+class CargaEnSegundoPlano:
+    """Ejecuta ``preparar()`` en un hilo y guarda su resultado."""
+
+    def __init__(self, preparar, nombre="datos"):
+        self._preparar = preparar
+        self.nombre = nombre
+        self._terminada = threading.Event()
+        self.resultado = None
+        self.error = None
+
+        hilo = threading.Thread(target=self._ejecutar, name=f"carga-{nombre}", daemon=True)
+        hilo.start()
+
+    def _ejecutar(self):
+        try:
+            with etapa(f"carga:{self.nombre}"):
+                self.resultado = self._preparar()
+        except Exception as error:
+            self.error = error
+            traceback.print_exc()
+        finally:
+            self._terminada.set()
+
+    @property
+    def lista(self):
+        return self._terminada.is_set() and self.error is None
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que termine la carga; devuelve el resultado o lanza su error."""
+        self._terminada.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.resultado
+
+
+# ============================================================
+# OPCIONES DE LOS DROPDOWNS EN CACHE
+# ============================================================
+
+def leer_opciones(nombre, fuentes=FUENTES_DIMENSIONES):
+    """Opciones guardadas en la carga anterior, o None si no hay o son mas viejas que alguna de ``fuentes``."""
+    ruta = os.path.join(DIRECTORIO_OPCIONES, f"{nombre}.json")
+    if not vigente(ruta, fuentes):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_opciones(nombre, opciones):
+    os.makedirs(DIRECTORIO_OPCIONES, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_OPCIONES, f"{nombre}.json")
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(opciones, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+# ============================================================
+# INDICADOR DE CARGA
+# ============================================================
+
+def indicador_carga(carga):
+    """Componentes del layout para seguir la carga: texto, intervalo y bandera de listo.
+
+    - ``estado_carga``: mensaje visible mientras se cargan los datos.
+    - ``intervalo_carga``: revisa cada segundo; se desactiva al terminar.
+    - ``datos_listos``: True cuando los callbacks ya pueden consultar los datos.
+    """
+    return html.Div([
+        html.Div(
+            "" if carga.lista else "Cargando datos del SNIB…",
+            id="estado_carga",
+            style={"textAlign": "center", "color": "#7f8c8d"},
+        ),
+        dcc.Interval(id="intervalo_carga", interval=1000, disabled=carga.lista),
+        dcc.Store(id="datos_listos", data=carga.lista),
+    ])
@@ -0,0 +1,123 @@
+# ============================================================
+# Compactacion del export del SNIB.
+# Reescribe SNIBEjemplares.parquet una sola vez ordenado por año, pais y
+# coleccion (ORDEN_FISICO), con row groups de tamaño fijo, estadisticas
+# min/max, codificacion por diccionario en las columnas de baja cardinalidad
+# y compresion zstd. Asi cualquier scan que filtre por año o pais se salta la
+# mayoria de los row groups. El cubo se escribe con el mismo orden fisico.
+#
+# Con --particionar la salida es un directorio hive
+# (aniocolecta=YYYY/grupobio=X/*.parquet): una consulta por año solo abre
+# los archivos de ese año y cada particion se puede leer en paralelo.
+# scan_snib (snib_cubo) lee cualquiera de los dos formatos.
+#
+# Uso:
+#   python snib_compactar.py [ruta_parquet_snib] [--salida ruta_compacta]
+#   python snib_compactar.py [ruta_parquet_snib] --particionar
+#   SNIB_PARQUET=ruta_compacta python snib_cubo.py
+# ============================================================
+
+import argparse
+import os
+import shutil
+
+import polars as pl
+
+from snib_cubo import (
+    COLUMNAS_PARTICION,
+    FILAS_POR_ROW_GROUP,
+    ORDEN_FISICO,
+    PARQUET_SNIB,
+    scan_snib,
+    sink_ordenado,
+)
+from snib_ejecucion import ejecutar_varios
+
+
+def ruta_compacta(parquet_path, particionar=False):
+    base, extension = os.path.splitext(parquet_path)
+    if particionar:
+        return f"{base}_particionado"
+    return f"{base}_compacto{extension}"
+
+
+def compactar(parquet_path=PARQUET_SNIB, salida=None):
+    """Escribe una copia ordenada y compactada del export; devuelve su ruta.
+
+    Se escribe primero a un archivo temporal para que un fallo a la mitad no
+    deje un parquet truncado en la ruta final.
+    """
+    salida = salida or ruta_compacta(parquet_path)
+    temporal = f"{salida}.{os.getpid()}.tmp"
+    ejecutar_varios([sink_ordenado(scan_snib(parquet_path), temporal)])
+    os.replace(temporal, salida)
+    return salida
+
+
+def particionar(parquet_path=PARQUET_SNIB, salida=None):
+    """Escribe el export como directorio hive por COLUMNAS_PARTICION; devuelve su ruta.
+
+    Dentro de cada particion las filas conservan ORDEN_FISICO. El directorio
+    se arma aparte y reemplaza al anterior solo cuando termino de escribirse.
+    """
+    salida = salida or ruta_compacta(parquet_path, particionar=True)
+    temporal = f"{salida}.{os.getpid()}.tmp"
+    ejecutar_varios([
+        scan_snib(parquet_path)
+        .sort(ORDEN_FISICO, nulls_last=True)
+        .sink_parquet(
+            pl.PartitionBy(temporal, key=COLUMNAS_PARTICION),
+            compression="zstd",
+            statistics=True,
+            row_group_size=FILAS_POR_ROW_GROUP,
+            mkdir=True,
+            lazy=True,
+        )
+    ])
+    if os.path.isdir(salida):
+        shutil.rmtree(salida)
+    os.replace(temporal, salida)
+    return salida
+
+
+def resumen(parquet_path):
+    """Filas, archivos y tamaño en disco (el conteo de filas sale de los metadatos)."""
+    if os.path.isdir(parquet_path):
+        archivos = [
+            os.path.join(raiz, nombre)
+            for raiz, _, nombres in os.walk(parquet_path)
+            for nombre in nombres
+        ]
+    else:
+        archivos = [parquet_path]
+    return {
+        "filas": scan_snib(parquet_path).select(pl.len()).collect().item(),
+        "archivos": len(archivos),
+        "mb": sum(os.path.getsize(archivo) for archivo in archivos) / 1024 / 1024,
+    }
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reescribe el export del SNIB ordenado y compactado.")
+    parser.add_argument("parquet", nargs="?", default=PARQUET_SNIB,
+                        help="Ruta a SNIBEjemplares.parquet")
+    parser.add_argument("--salida", default=None,
+                        help="Ruta de salida (por defecto <nombre>_compacto.parquet o <nombre>_particionado)")
+    parser.add_argument("--particionar", action="store_true",
+                        help=f"Escribe un directorio hive particionado por {', '.join(COLUMNAS_PARTICION)}")
+    args = parser.parse_args()
+
+    if args.particionar:
+        salida = particionar(args.parquet, args.salida)
+    else:
+        salida = compactar(args.parquet, args.salida)
+
+    for etiqueta, ruta in (("Original", args.parquet), ("Salida", salida)):
+        datos = resumen(ruta)
+        print(f"✓ {etiqueta}: {ruta}")
+        print(f"  {datos['filas']} filas, {datos['archivos']} archivos, {datos['mb']:.1f} MB")
+    print(f"✓ Ordenado por: {', '.join(ORDEN_FISICO)}; {FILAS_POR_ROW_GROUP} filas por row group")
@@ -0,0 +1,103 @@
+# ============================================================
+# Datos compartidos entre los procesos que sirven un dashboard.
+# Con la variable de entorno SNIB_DATOS_IPC apuntando a un directorio, las
+# tablas que prepara cada dashboard se escriben una sola vez como Arrow IPC
+# sin comprimir y cada worker las abre mapeadas en memoria: todos comparten
+# las mismas paginas del archivo en lugar de tener su propia copia.
+# Sin la variable, las tablas se calculan en el proceso como siempre.
+# ============================================================
+
+import os
+
+import polars as pl
+import pyarrow as pa
+
+from snib_cubo import CUBO_PATH
+from snib_limpieza import CUBO_LIMPIO_PATH
+
+# Archivos de los que salen las tablas de los dashboards del cubo de
+# dimensiones: el cubo y su version limpia. El cubo limpio solo se regenera
+# dentro de preparar(), asi que tambien hay que comparar contra el cubo.
+FUENTES_DIMENSIONES = (CUBO_PATH, CUBO_LIMPIO_PATH)
+
+
+def cargar_compartido(nombre, preparar, fuentes=FUENTES_DIMENSIONES):
+    """Devuelve las tablas {tabla: DataFrame} que produce ``preparar()``.
+
+    Si SNIB_DATOS_IPC esta definida, las tablas se leen de
+    ``<directorio>/<nombre>_<tabla>.arrow`` mapeadas en memoria y solo se
+    recalculan cuando faltan o son mas viejas que alguna de ``fuentes``.
+    """
+    directorio = os.environ.get("SNIB_DATOS_IPC")
+    if not directorio:
+        return preparar()
+
+    indice_path = os.path.join(directorio, f"{nombre}.tablas")
+    if vigente(indice_path, fuentes):
+        with open(indice_path, encoding="utf-8") as f:
+            tablas = f.read().split()
+    else:
+        tablas = _escribir(directorio, nombre, indice_path, preparar())
+
+    return {
+        tabla: leer_mapeado(os.path.join(directorio, f"{nombre}_{tabla}.arrow"))
+        for tabla in tablas
+    }
+
+
+def leer_mapeado(ruta):
+    """DataFrame sobre el archivo Arrow IPC ``ruta`` mapeado en memoria, sin copiarlo.
+
+    pl.read_ipc (y scan_ipc) copian el archivo completo a memoria privada del
+    proceso; con pyarrow los buffers quedan respaldados por el archivo y los
+    procesos que lo abren comparten sus paginas. Solo los indices de las
+    columnas Enum (1 o 2 bytes por fila) se copian al convertirlos a Polars.
+    """
+    tabla = pa.ipc.open_file(pa.memory_map(ruta)).read_all()
+    return pl.from_arrow(tabla, rechunk=False)
+
+
+def vigente(ruta, fuentes):
+    """True si ``ruta`` existe y no es mas vieja que ninguna de las ``fuentes`` que existen."""
+    if not os.path.exists(ruta):
+        return False
+    return all(
+        os.path.getmtime(ruta) >= os.path.getmtime(fuente)
+        for fuente in fuentes
+        if os.path.exists(fuente)
+    )
+
+
+def _escribir(directorio, nombre, indice_path, tablas):
+    os.makedirs(directorio, exist_ok=True)
+
+    # Se escribe a un temporal y se renombra: un worker nunca ve un archivo a medias
+    for tabla, df in tablas.items():
+        ruta = os.path.join(directorio, f"{nombre}_{tabla}.arrow")
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        df.write_ipc(temporal, compression="uncompressed")
+        os.replace(temporal, ruta)
+
+    temporal = f"{indice_path}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write("\n".join(tablas))
+    os.replace(temporal, indice_path)
+
+    return list(tablas)
+
+
+def indice_rebanadas(df, claves):
+    """Posicion (inicio, largo) de cada combinacion de ``claves``.
+
+    ``df`` debe venir ordenado por ``claves``; ``df.slice(inicio, largo)``
+    devuelve la rebanada sin copiar datos, tambien sobre un archivo mapeado.
+    """
+    posiciones = (
+        df.with_row_index("fila")
+        .group_by(claves, maintain_order=True)
+        .agg(pl.col("fila").first().alias("inicio"), pl.len().alias("largo"))
+    )
+    return {
+        tuple(fila[:-2]): (fila[-2], fila[-1])
+        for fila in posiciones.iter_rows()
+    }
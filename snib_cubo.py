@@ -0,0 +1,355 @@
+# ============================================================
+# Cubos de agregados del SNIB.
+# Recorre una sola vez SNIBEjemplares.parquet y guarda dos cubos con el
+# conteo de ejemplares:
+#   - el de dimensiones (<cubo>.parquet): por año, coleccion, pais, grupo
+#     biologico, procedencia y estatus taxonomico
+#   - el taxonomico (<cubo>_taxones.parquet): por ruta taxonomica (reino a
+#     genero)
+# Un solo cubo con todas las llaves tendria casi una fila por registro; por
+# separado cada uno tiene las combinaciones que de verdad consultan las
+# graficas y dashboards, que leen el que necesitan en lugar del export.
+#
+# Cuando llega un export nuevo (SNIBEjemplares_AAAAMMDD_HHMMSS) los cubos se
+# pueden actualizar de forma incremental: se compara la huella de cada
+# registro (hash de su idejemplar y sus llaves) contra la del export anterior y
+# solo se suman/restan los conteos de los registros nuevos, borrados o
+# modificados. El archivo de huellas guarda tambien las llaves de cada
+# registro: lo que se resta sale de ahi, sin volver a leer el export anterior.
+# El hash de Polars puede cambiar entre versiones: el estado guarda la version
+# con la que se calcularon las huellas y con otra se pide reconstruir.
+#
+# Uso:
+#   python snib_cubo.py [ruta_parquet_snib] [--salida ruta_cubo]
+#   python snib_cubo.py ruta_parquet_nuevo --incremental [--verificar]
+#   python snib_cubo.py ruta_parquet --verificar    # compara con una reconstruccion
+# ============================================================
+
+import argparse
+import json
+import os
+import sys
+
+import polars as pl
+
+from snib_ejecucion import ejecutar, ejecutar_varios
+from snib_perfil import perfilado
+
+# ============================================================
+# 1. RUTAS
+# ============================================================
+
+PARQUET_SNIB = os.environ.get(
+    "SNIB_PARQUET",
+    r"C:\Users\danti\Downloads\SNIBEjemplares_20250710_004212\SNIBEjemplares.parquet",
+)
+CUBO_PATH = os.environ.get("SNIB_CUBO", "./data/snib_cubo.parquet")
+
+# ============================================================
+# 2. LLAVES DE LOS CUBOS
+# ============================================================
+
+DIMENSIONES = [
+    "aniocolecta",
+    "coleccion",
+    "paiscoleccion",
+    "grupobio",
+    "procedenciaejemplar",
+    "estatustax",
+]
+
+RANGOS_TAXONOMICOS = [
+    "reinovalido",
+    "phylumdivisionvalido",
+    "clasevalida",
+    "ordenvalido",
+    "familiavalida",
+    "generovalido",
+]
+
+# Todas las columnas que alimentan algun cubo (la huella de cada registro)
+LLAVES_CUBO = DIMENSIONES + RANGOS_TAXONOMICOS
+
+# Identificador unico de cada ejemplar en el export
+LLAVE_REGISTRO = "idejemplar"
+
+# Orden fisico de los archivos: casi todas las consultas filtran por año y
+# pais, asi cada row group cubre un rango angosto y sus estadisticas min/max
+# permiten saltarse los que no coinciden
+ORDEN_FISICO = ["aniocolecta", "paiscoleccion", "coleccion"]
+FILAS_POR_ROW_GROUP = int(os.environ.get("SNIB_FILAS_ROW_GROUP", "128000"))
+
+# Particiones del export en formato hive (aniocolecta=YYYY/grupobio=X/); se
+# leen siempre como texto para que "0", "null" y los años no cambien de tipo
+COLUMNAS_PARTICION = ["aniocolecta", "grupobio"]
+
+
+def scan_snib(parquet_path=PARQUET_SNIB):
+    """``pl.scan_parquet`` del export, sea un solo archivo o un directorio particionado."""
+    if os.path.isdir(parquet_path):
+        return pl.scan_parquet(
+            parquet_path,
+            hive_partitioning=True,
+            hive_schema={columna: pl.String for columna in COLUMNAS_PARTICION},
+        )
+    return pl.scan_parquet(parquet_path)
+
+
+def rutas_auxiliares(cubo_path=CUBO_PATH):
+    """Rutas de las huellas por registro y del estado del ultimo export."""
+    base = os.path.splitext(cubo_path)[0]
+    return base + "_huellas.parquet", base + "_estado.json"
+
+
+def ruta_taxones(cubo_path=CUBO_PATH):
+    """Ruta del cubo taxonomico que se genera junto al cubo de dimensiones ``cubo_path``."""
+    return os.path.splitext(cubo_path)[0] + "_taxones.parquet"
+
+
+CUBO_TAXONES_PATH = ruta_taxones()
+
+
+def cubos(cubo_path=CUBO_PATH):
+    """(ruta, llaves, orden fisico) de cada cubo que se genera a partir de ``cubo_path``."""
+    return [
+        (cubo_path, DIMENSIONES, ORDEN_FISICO),
+        (ruta_taxones(cubo_path), RANGOS_TAXONOMICOS, RANGOS_TAXONOMICOS),
+    ]
+
+
+def construir_cubo(parquet_path=PARQUET_SNIB, llaves=DIMENSIONES):
+    """Plan lazy que agrupa el export completo por ``llaves``.
+
+    Los valores se conservan tal cual vienen en el export (incluidos nulos y
+    centinelas como "NO APLICA"), asi cada grafica aplica sus propios filtros
+    sobre el cubo igual que antes lo hacia sobre las filas originales.
+    """
+    return (
+        scan_snib(parquet_path)
+        .select(llaves)
+        .group_by(llaves)
+        .agg(pl.len().alias("conteo"))
+    )
+
+
+def cargar_cubo(cubo_path=CUBO_PATH):
+    """LazyFrame sobre el cubo ya calculado.
+
+    Las consultas que antes usaban ``pl.len()`` deben sumar ``conteo``.
+    """
+    if not os.path.exists(cubo_path):
+        raise FileNotFoundError(
+            f"No existe el cubo {cubo_path}; generelo con: python snib_cubo.py <SNIBEjemplares.parquet>"
+        )
+    return pl.scan_parquet(cubo_path)
+
+
+def construir_huellas(parquet_path):
+    """Plan lazy con la huella de cada registro: su llave, sus llaves de los cubos y el hash de ambas.
+
+    El hash incluye la llave del registro, asi las huellas se comparan por
+    una sola columna entera: un registro nuevo, borrado o modificado tiene
+    una huella que no aparece en el otro export.
+    """
+    return (
+        scan_snib(parquet_path)
+        .select(
+            pl.col(LLAVE_REGISTRO),
+            pl.struct([LLAVE_REGISTRO] + LLAVES_CUBO).hash().alias("huella"),
+            *LLAVES_CUBO,
+        )
+    )
+
+
+def _guardar_estado(parquet_path, cubo_path):
+    _, estado_path = rutas_auxiliares(cubo_path)
+    estado = {"parquet": os.path.abspath(parquet_path), "polars": pl.__version__}
+    with open(estado_path, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+
+
+def _leer_estado(cubo_path):
+    _, estado_path = rutas_auxiliares(cubo_path)
+    if not os.path.exists(estado_path):
+        return {}
+    with open(estado_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sink_ordenado(lazy_df, ruta, orden=ORDEN_FISICO):
+    """Sink lazy a parquet ordenado por ``orden``, con zstd y estadisticas por row group.
+
+    Polars codifica con diccionario las columnas de texto de baja cardinalidad.
+    """
+    return lazy_df.sort(orden, nulls_last=True).sink_parquet(
+        ruta,
+        compression="zstd",
+        statistics=True,
+        row_group_size=FILAS_POR_ROW_GROUP,
+        lazy=True,
+    )
+
+
+@perfilado("cubo")
+def escribir_cubo(parquet_path=PARQUET_SNIB, cubo_path=CUBO_PATH):
+    huellas_path, _ = rutas_auxiliares(cubo_path)
+    os.makedirs(os.path.dirname(cubo_path) or ".", exist_ok=True)
+
+    # Los cubos y las huellas salen de la misma lectura y se escriben por
+    # bloques: ni las filas del export ni las huellas por registro se cargan
+    # completas
+    ejecutar_varios([
+        *[
+            sink_ordenado(construir_cubo(parquet_path, llaves), ruta, orden)
+            for ruta, llaves, orden in cubos(cubo_path)
+        ],
+        construir_huellas(parquet_path).sink_parquet(huellas_path, compression="zstd", lazy=True),
+    ])
+
+    _guardar_estado(parquet_path, cubo_path)
+
+
+@perfilado("cubo_incremental")
+def actualizar_cubo(parquet_nuevo, cubo_path=CUBO_PATH):
+    """Aplica a los cubos solo los deltas entre el export anterior y el nuevo.
+
+    Un registro nuevo suma 1 a su combinacion, uno borrado resta 1 y uno
+    modificado (misma llave, distinta huella) resta en la combinacion vieja
+    y suma en la nueva. El export nuevo se lee una sola vez; los valores de
+    lo que se resta salen de las huellas guardadas.
+    """
+    huellas_path, _ = rutas_auxiliares(cubo_path)
+    huellas_anteriores = pl.scan_parquet(huellas_path)
+
+    # Huellas de otra version de Polars no se comparan con las nuevas
+    version = _leer_estado(cubo_path).get("polars")
+    if version != pl.__version__:
+        raise ValueError(
+            f"Las huellas {huellas_path} se calcularon con Polars {version or 'desconocido'} "
+            f"y este es {pl.__version__}; "
+            "reconstruya los cubos con: python snib_cubo.py <SNIBEjemplares.parquet>"
+        )
+
+    faltantes = [columna for columna in LLAVES_CUBO if columna not in huellas_anteriores.collect_schema()]
+    if faltantes:
+        raise ValueError(
+            f"Las huellas {huellas_path} no guardan las llaves de los cubos ({', '.join(faltantes)}); "
+            "reconstruya los cubos con: python snib_cubo.py <SNIBEjemplares.parquet>"
+        )
+
+    # Las huellas nuevas van a un archivo temporal para no tenerlas completas en memoria
+    huellas_nuevas_path = f"{huellas_path}.{os.getpid()}.tmp"
+    ejecutar_varios([
+        construir_huellas(parquet_nuevo).sink_parquet(huellas_nuevas_path, compression="zstd", lazy=True)
+    ])
+    huellas_nuevas = pl.scan_parquet(huellas_nuevas_path)
+
+    # Primero solo las huellas que cambiaron: el join compara una columna
+    # entera y no arrastra las llaves de todos los registros
+    altas_df, bajas_df = ejecutar_varios([
+        huellas_nuevas.select("huella").join(huellas_anteriores.select("huella"), on="huella", how="anti"),
+        huellas_anteriores.select("huella").join(huellas_nuevas.select("huella"), on="huella", how="anti"),
+    ])
+
+    def delta(huellas, cambios_df, signo):
+        return (
+            huellas
+            .filter(pl.col("huella").is_in(cambios_df["huella"].implode()))
+            .group_by(LLAVES_CUBO)
+            .agg((pl.len().cast(pl.Int64) * signo).alias("conteo"))
+        )
+
+    # Los deltas son pocos (solo los registros que cambiaron); se calculan una
+    # vez con todas las llaves y cada cubo los suma a su nivel
+    deltas_df = ejecutar(pl.concat([
+        delta(huellas_nuevas, altas_df, 1),
+        delta(huellas_anteriores, bajas_df, -1),
+    ]))
+
+    for ruta, llaves, orden in cubos(cubo_path):
+        aplicar_deltas(ruta, llaves, orden, deltas_df)
+    os.replace(huellas_nuevas_path, huellas_path)
+    _guardar_estado(parquet_nuevo, cubo_path)
+
+
+def aplicar_deltas(cubo_path, llaves, orden, deltas_df):
+    """Suma ``deltas_df`` (conteos con signo) al cubo ``cubo_path`` agrupado por ``llaves``."""
+    cubo_lazy_df = (
+        pl.concat([
+            cargar_cubo(cubo_path).with_columns(pl.col("conteo").cast(pl.Int64)),
+            deltas_df.lazy().select(llaves + ["conteo"]),
+        ])
+        .group_by(llaves)
+        .agg(pl.col("conteo").sum())
+        .filter(pl.col("conteo") > 0)
+        .with_columns(pl.col("conteo").cast(pl.UInt32))
+    )
+
+    temporal = f"{cubo_path}.{os.getpid()}.tmp"
+    ejecutar_varios([sink_ordenado(cubo_lazy_df, temporal, orden)])
+    os.replace(temporal, cubo_path)
+
+
+def verificar_cubo(parquet_path, cubo_path=CUBO_PATH):
+    """Compara cada cubo guardado con una reconstruccion completa desde ``parquet_path``.
+
+    Devuelve {ruta: filas (combinacion y conteo) que estan en solo uno de los
+    dos}; un conteo distinto cuenta dos veces. Todo en 0 quiere decir que los
+    cubos (por ejemplo, despues de varias actualizaciones incrementales) son
+    iguales a los de una construccion completa.
+    """
+    planes = []
+    for ruta, llaves, _ in cubos(cubo_path):
+        columnas = llaves + ["conteo"]
+        guardado = cargar_cubo(ruta).with_columns(pl.col("conteo").cast(pl.UInt32))
+        completo = construir_cubo(parquet_path, llaves).with_columns(pl.col("conteo").cast(pl.UInt32))
+        planes.append(
+            pl.concat([
+                completo.join(guardado, on=columnas, how="anti", nulls_equal=True),
+                guardado.join(completo, on=columnas, how="anti", nulls_equal=True),
+            ])
+            .select(pl.len())
+        )
+
+    return {
+        ruta: diferencias_df.item()
+        for (ruta, _, _), diferencias_df in zip(cubos(cubo_path), ejecutar_varios(planes))
+    }
+
+
+# ============================================================
+# 3. EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera los cubos de agregados del SNIB.")
+    parser.add_argument("parquet", nargs="?", default=PARQUET_SNIB,
+                        help="Ruta a SNIBEjemplares.parquet")
+    parser.add_argument("--salida", default=CUBO_PATH,
+                        help="Ruta del cubo de dimensiones (el taxonomico va junto a el)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Actualiza los cubos existentes con los cambios respecto al export anterior")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Compara los cubos con una reconstruccion completa desde el export; "
+                             "sin --incremental no escribe nada")
+    args = parser.parse_args()
+
+    if args.incremental:
+        actualizar_cubo(args.parquet, args.salida)
+    elif not args.verificar:
+        escribir_cubo(args.parquet, args.salida)
+
+    # Solo con --verificar (sin --incremental) no se escribe nada
+    if args.incremental or not args.verificar:
+        for ruta, _, _ in cubos(args.salida):
+            combinaciones, ejemplares = pl.scan_parquet(ruta).select(pl.len(), pl.col("conteo").sum()).collect().row(0)
+            print(f"✓ Cubo escrito en: {ruta}")
+            print(f"✓ Combinaciones: {combinaciones}")
+            print(f"✓ Ejemplares: {ejemplares}")
+
+    if args.verificar:
+        diferencias = verificar_cubo(args.parquet, args.salida)
+        for ruta, filas in diferencias.items():
+            marca = "⚠" if filas else "✓"
+            print(f"{marca} {ruta}: {filas} filas distintas de una reconstruccion completa")
+        sys.exit(1 if any(diferencias.values()) else 0)
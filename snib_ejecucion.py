@@ -0,0 +1,61 @@
+# ============================================================
+# Ejecucion comun de los planes lazy del SNIB.
+# Todas las graficas, dashboards y los cubos ejecutan sus consultas con el
+# motor de streaming de Polars: el export se lee por bloques en lugar de
+# cargarse completo. Eso acota la memoria de la lectura, no la de la
+# agregacion: un group_by guarda una entrada por cada combinacion distinta, asi
+# que su pico crece con el numero de grupos del resultado (por eso snib_cubo.py
+# separa el cubo de dimensiones del taxonomico).
+#
+# Polars no tiene un limite duro de memoria; el presupuesto (SNIB_MEMORIA_MB)
+# se traduce en el tamaño de bloque del streaming: filas por bloque =
+# presupuesto / (hilos * bytes estimados por fila * bloques en vuelo).
+#
+# Con SNIB_PERFIL cada ejecucion queda registrada como etapa (snib_perfil.py).
+# ============================================================
+
+import os
+
+import polars as pl
+
+from snib_perfil import activo, ejecutar_perfilado, ejecutar_varios_perfilado
+
+MEMORIA_MB = int(os.environ.get("SNIB_MEMORIA_MB", "0")) or None
+
+# Estimacion conservadora para filas del SNIB (columnas de texto cortas)
+BYTES_POR_FILA = 256
+# Bloques que cada hilo puede tener en proceso a la vez
+BLOQUES_EN_VUELO = 4
+FILAS_MINIMAS_POR_BLOQUE = 1_000
+
+
+def filas_por_bloque(memoria_mb=MEMORIA_MB):
+    """Tamaño de bloque del streaming para el presupuesto dado, o None para el de Polars."""
+    if not memoria_mb:
+        return None
+    presupuesto = memoria_mb * 1024 * 1024
+    filas = presupuesto // (pl.thread_pool_size() * BYTES_POR_FILA * BLOQUES_EN_VUELO)
+    return max(FILAS_MINIMAS_POR_BLOQUE, int(filas))
+
+
+def _config(memoria_mb):
+    filas = filas_por_bloque(memoria_mb)
+    if filas is None:
+        return pl.Config()
+    return pl.Config(streaming_chunk_size=filas)
+
+
+def ejecutar(lazy_df, memoria_mb=MEMORIA_MB):
+    """``lazy_df.collect()`` con el motor de streaming y el presupuesto de memoria."""
+    with _config(memoria_mb):
+        if activo():
+            return ejecutar_perfilado(lazy_df, lambda: lazy_df.collect(engine="streaming"))
+        return lazy_df.collect(engine="streaming")
+
+
+def ejecutar_varios(lazy_dfs, memoria_mb=MEMORIA_MB):
+    """Ejecuta varios planes (o sinks lazy) juntos: las lecturas comunes se hacen una vez."""
+    with _config(memoria_mb):
+        if activo():
+            return ejecutar_varios_perfilado(lazy_dfs, lambda: pl.collect_all(lazy_dfs, engine="streaming"))
+        return pl.collect_all(lazy_dfs, engine="streaming")
@@ -0,0 +1,80 @@
+# ============================================================
+# Esquema de tipos del SNIB: diccionario global de valores.
+# Las columnas de texto muy repetidas (coleccion, pais, grupo biologico,
+# procedencia, estatus y los rangos taxonomicos) se guardan en los cubos
+# limpios como pl.Enum. Sus categorias salen de un diccionario en JSON que se
+# guarda junto al cubo y solo crece: un valor conserva su codigo entre
+# regeneraciones y los valores nuevos se agregan al final.
+#
+# Todos los scripts leen el mismo tipo Enum desde el esquema del cubo limpio;
+# group_by, is_in y los filtros comparan codigos enteros en lugar de texto.
+#
+# Uso:
+#   tipo = enum_con(snib_lazy_df.collect_schema()["coleccion"], "Otras")
+# ============================================================
+
+import json
+import os
+
+import polars as pl
+
+from snib_cubo import CUBO_PATH, DIMENSIONES, RANGOS_TAXONOMICOS
+from snib_ejecucion import ejecutar
+
+DICCIONARIO_PATH = os.environ.get(
+    "SNIB_DICCIONARIO", os.path.splitext(CUBO_PATH)[0] + "_diccionario.json"
+)
+
+COLUMNAS_ENUM = [columna for columna in DIMENSIONES if columna != "aniocolecta"] + RANGOS_TAXONOMICOS
+
+
+def leer_diccionario(ruta=DICCIONARIO_PATH):
+    """{columna: [valores]} guardado, o un diccionario vacio si aun no existe."""
+    if not os.path.exists(ruta):
+        return {columna: [] for columna in COLUMNAS_ENUM}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def actualizar_diccionario(lazy_df, ruta=DICCIONARIO_PATH):
+    """Agrega al diccionario los valores de ``lazy_df`` que aun no tiene y lo guarda.
+
+    Los valores existentes no cambian de posicion; los nuevos se agregan en
+    orden alfabetico al final de su columna.
+    """
+    diccionario = leer_diccionario(ruta)
+    valores_df = ejecutar(
+        lazy_df.select([pl.col(columna).drop_nulls().unique().implode() for columna in COLUMNAS_ENUM])
+    )
+
+    for columna in COLUMNAS_ENUM:
+        conocidos = diccionario.setdefault(columna, [])
+        presentes = set(conocidos)
+        conocidos.extend(sorted(v for v in valores_df[columna][0] if v not in presentes))
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(diccionario, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, ruta)
+    return diccionario
+
+
+def tipos(diccionario, columnas=COLUMNAS_ENUM):
+    """{columna: pl.Enum} para castear las ``columnas`` de un cubo limpio."""
+    return {columna: pl.Enum(diccionario[columna]) for columna in COLUMNAS_ENUM if columna in columnas}
+
+
+def resumen_esquema(esquema):
+    """{columna: nombre del tipo}, sin las categorias de los Enum (para imprimir)."""
+    return {columna: type(tipo).__name__ for columna, tipo in esquema.items()}
+
+
+def enum_con(tipo, *etiquetas):
+    """El Enum ``tipo`` ampliado con etiquetas propias de una grafica (por ejemplo "Otras").
+
+    Un Enum no acepta valores fuera de sus categorias; para agrupar con una
+    etiqueta nueva se castea la columna a este tipo ampliado.
+    """
+    categorias = list(tipo.categories)
+    return pl.Enum(categorias + [e for e in etiquetas if e not in categorias])
@@ -0,0 +1,154 @@
+# ============================================================
+# Presupuesto de tamaño para las figuras de Plotly del SNIB.
+# Las graficas con eje de años (1500-2025) mandan cada punto al HTML/JSON y
+# pueden pesar varios MB. Aqui se arma la figura de forma que quepa en un
+# presupuesto (SNIB_PRESUPUESTO_KB): los arreglos numericos se envian como
+# arreglos tipados en base64 (flotantes en float32) en lugar de listas JSON,
+# solo se pasan las columnas que la figura usa y, si aun no cabe, los años
+# se agrupan en intervalos cada vez mas anchos. El ancho se elige estimando
+# el tamaño a partir de la tabla agregada (trazas y puntos), sin armar la
+# figura; solo se arma la del ancho elegido y se informa su tamaño final.
+#
+# Uso:
+#   fig = ajustar_a_presupuesto(construir, conteo_df, "Areas por coleccion", trazas="coleccion")
+# donde construir(df, ancho) arma la figura a partir de df ya agrupado en
+# intervalos de ``ancho`` años (y pasado por ``preparar`` si se indica).
+# ============================================================
+
+import os
+
+import numpy as np
+import polars as pl
+
+PRESUPUESTO_KB = int(os.environ.get("SNIB_PRESUPUESTO_KB", "512"))
+
+# Anchos de intervalo (en años) que se prueban en orden
+ANCHOS_ANIOS = [1, 2, 5, 10, 25, 50, 100]
+
+# Bytes de JSON de cada traza sin contar sus arreglos (nombre, color, hover,
+# grupo de leyenda...), medido sobre las figuras de plotly.express
+BYTES_POR_TRAZA = 450
+
+# Atributos de las trazas que pueden llevar arreglos numericos grandes
+ATRIBUTOS_NUMERICOS = ("x", "y", "z", "values", "customdata", "marker.size")
+
+
+def agrupar_anios(df, ancho, columna="aniocolecta", valores=("conteo",)):
+    """Suma ``valores`` en intervalos de ``ancho`` años.
+
+    Cada año se reemplaza por el inicio de su intervalo (1990, 1995, ...) y
+    las filas se vuelven a agrupar por el resto de las columnas.
+    """
+    if ancho == 1:
+        return df
+    valores = list(valores)
+    claves = [c for c in df.columns if c not in valores]
+    return (
+        df
+        .with_columns((pl.col(columna) // ancho * ancho).cast(df.schema[columna]))
+        .group_by(claves, maintain_order=True)
+        .agg(pl.col(valores).sum())
+    )
+
+
+def recortar_columnas(df, columnas):
+    """Solo las columnas que la figura usa: plotly.express serializa las que recibe en hover."""
+    return df.select(columnas)
+
+
+def _tipado(valor):
+    """Arreglo tipado equivalente a ``valor``, o None si no es numerico."""
+    arreglo = np.asarray(valor)
+    if arreglo.dtype.kind == "f":
+        return arreglo.astype(np.float32)
+    if arreglo.dtype.kind in "iu":
+        # Plotly ya codifica los enteros con el tipo mas chico que los contiene
+        return arreglo
+    return None
+
+
+def compactar(fig):
+    """Convierte los arreglos numericos de cada traza a arreglos de numpy.
+
+    Plotly serializa los arreglos de numpy como arreglos tipados en base64,
+    bastante mas chicos que una lista JSON de numeros; los flotantes se
+    bajan a float32.
+    """
+    for traza in fig.data:
+        for atributo in ATRIBUTOS_NUMERICOS:
+            # Preguntar antes: un atributo invalido hace que Plotly busque
+            # nombres parecidos para el mensaje de error, y eso es lento
+            if atributo not in traza:
+                continue
+            valor = traza[atributo]
+            if valor is None or np.ndim(valor) == 0:
+                continue
+            tipado = _tipado(valor)
+            if tipado is not None:
+                traza[atributo] = tipado
+    return fig
+
+
+def _bytes_por_valor(serie):
+    """Bytes que ocupa en el JSON cada valor de ``serie`` una vez compactada."""
+    if serie.dtype.is_float():
+        return 4 * 4 / 3  # float32 en base64
+    if serie.dtype.is_integer():
+        tipo = np.result_type(np.min_scalar_type(serie.min() or 0), np.min_scalar_type(serie.max() or 0))
+        return tipo.itemsize * 4 / 3
+    # Texto: cada valor va entre comillas y separado por coma
+    return (serie.cast(pl.Utf8).str.len_bytes().mean() or 0) + 3
+
+
+def estimar_kb(df, trazas=None):
+    """Tamaño aproximado en KB de la figura compactada que grafica ``df``.
+
+    Una traza por valor de la columna ``trazas`` (una sola si es None) y un
+    valor por fila en cada una de las demas columnas.
+    """
+    num_trazas = df[trazas].n_unique() if trazas else 1
+    puntos = sum(_bytes_por_valor(df[c]) for c in df.columns if c != trazas) * df.height
+    return (num_trazas * BYTES_POR_TRAZA + puntos) / 1024
+
+
+def tamano_kb(fig):
+    """Tamaño en KB del JSON de la figura tal como se manda al navegador."""
+    return len(fig.to_json().encode("utf-8")) / 1024
+
+
+def reportar(nombre, kb, presupuesto_kb, ancho=1):
+    intervalo = f", años cada {ancho}" if ancho > 1 else ""
+    if kb <= presupuesto_kb:
+        print(f"✓ {nombre}: {kb:.1f} KB (presupuesto {presupuesto_kb} KB{intervalo})")
+    else:
+        print(f"⚠ {nombre}: {kb:.1f} KB, excede el presupuesto de {presupuesto_kb} KB{intervalo}")
+
+
+def ajustar_a_presupuesto(
+    construir,
+    df,
+    nombre,
+    presupuesto_kb=PRESUPUESTO_KB,
+    columna="aniocolecta",
+    valores=("conteo",),
+    trazas=None,
+    preparar=None,
+):
+    """Arma la figura con ``construir(df, ancho)`` dentro del presupuesto.
+
+    Empieza año por año y pasa al siguiente ancho de ``ANCHOS_ANIOS``
+    mientras el tamaño estimado (``estimar_kb``) de la tabla agrupada, pasada
+    por ``preparar`` si se indica, exceda ``presupuesto_kb``; la figura se
+    arma una sola vez. Con ``columna=None`` no hay eje de años y solo se
+    compacta. Si ni el intervalo mas ancho cabe, devuelve ese y lo advierte.
+    """
+    anchos = ANCHOS_ANIOS if columna else [1]
+    for ancho in anchos:
+        datos_df = agrupar_anios(df, ancho, columna, valores) if columna else df
+        if preparar is not None:
+            datos_df = preparar(datos_df)
+        if estimar_kb(datos_df, trazas) <= presupuesto_kb:
+            break
+    fig = compactar(construir(datos_df, ancho))
+    reportar(nombre, tamano_kb(fig), presupuesto_kb, ancho)
+    return fig
@@ -0,0 +1,146 @@
+# ============================================================
+# Registro de las graficas del SNIB.
+# Cada script de grafica registra con @registrar_grafica("nombre") una funcion
+# que recibe el LazyFrame de un cubo limpio y devuelve la figura: el de
+# dimensiones por defecto, o el taxonomico con cubo="taxones". cargar_graficas
+# importa los scripts (por ruta: sus nombres llevan guiones) y devuelve el
+# registro; cargar_datos es el punto de entrada unico de los datos. Asi varias
+# graficas corren en un mismo proceso sobre un solo scan de cada cubo, o en
+# lote (exportar_graficas.py).
+#
+# Uso:
+#   graficas = cargar_graficas()
+#   grafica = graficas["areas_colecciones"]
+#   fig = grafica(cargar_datos(en_memoria=True, cubo=grafica.cubo))
+#
+#   python snib_graficas.py --listar
+#   python snib_graficas.py areas_colecciones matriz_calor [--fuente ruta.parquet] [--mostrar]
+# ============================================================
+
+import argparse
+import functools
+import importlib.util
+import os
+import re
+import sys
+import time
+
+import polars as pl
+
+from snib_ejecucion import ejecutar
+from snib_limpieza import cargar_limpio, cargar_taxones
+from snib_perfil import etapa
+
+DIRECTORIO_PROYECTO = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts que registran graficas
+SCRIPTS_GRAFICAS = [
+    "Grafica_areas-colecciones.py",
+    "Grafica_barras_coleccion-año.py",
+    "Grafica_matriz_calor_act.py",
+    "Grafica_sunburst-tax.py",
+    "grafica_H_proced_grpo-bio.py",
+    "grafica_tax.py",
+]
+
+# Cubo limpio que puede leer una grafica -> funcion que lo carga
+CUBOS = {"dimensiones": cargar_limpio, "taxones": cargar_taxones}
+
+# nombre -> funcion(snib_lazy_df) que devuelve la figura; su atributo ``cubo``
+# dice que cubo recibe
+GRAFICAS = {}
+
+
+def registrar_grafica(nombre, cubo="dimensiones"):
+    """Decorador: registra ``funcion(snib_lazy_df) -> figura`` bajo ``nombre``.
+
+    ``snib_lazy_df`` es el cubo limpio ``cubo`` (una llave de CUBOS). Con
+    SNIB_PERFIL cada llamada se registra como la etapa ``grafica:<nombre>``.
+    """
+    def registrar(funcion):
+        @functools.wraps(funcion)
+        def grafica(snib_lazy_df):
+            with etapa(f"grafica:{nombre}"):
+                return funcion(snib_lazy_df)
+        grafica.cubo = cubo
+        GRAFICAS[nombre] = grafica
+        return grafica
+    return registrar
+
+
+def _importar(script):
+    nombre = "grafica_" + re.sub(r"\W", "_", os.path.splitext(script)[0])
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    spec = importlib.util.spec_from_file_location(nombre, os.path.join(DIRECTORIO_PROYECTO, script))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def cargar_graficas(scripts=SCRIPTS_GRAFICAS):
+    """Importa los scripts de graficas y devuelve el registro {nombre: funcion}."""
+    if DIRECTORIO_PROYECTO not in sys.path:
+        sys.path.insert(0, DIRECTORIO_PROYECTO)
+    for script in scripts:
+        _importar(script)
+    return GRAFICAS
+
+
+def cargar_datos(fuente=None, en_memoria=False, cubo="dimensiones"):
+    """LazyFrame del cubo limpio ``cubo`` para las graficas.
+
+    Sin ``fuente`` es ``cargar_limpio()`` o ``cargar_taxones()`` (rutas por
+    SNIB_CUBO_LIMPIO y SNIB_TAXONES_LIMPIO, y se regeneran si el cubo cambio);
+    con ``fuente`` se lee ese parquet limpio. Con ``en_memoria`` el archivo se
+    lee una sola vez y todas las graficas consultan la misma tabla.
+    """
+    snib_lazy_df = CUBOS[cubo]() if fuente is None else pl.scan_parquet(fuente)
+    if en_memoria:
+        return ejecutar(snib_lazy_df).lazy()
+    return snib_lazy_df
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    # Los scripts registran sus graficas en el modulo snib_graficas, no en __main__
+    from snib_graficas import cargar_datos, cargar_graficas
+
+    graficas = cargar_graficas()
+
+    parser = argparse.ArgumentParser(description="Construye varias graficas del SNIB sobre un solo scan de cada cubo.")
+    parser.add_argument("nombres", nargs="*", default=sorted(graficas), help="Graficas a construir (por defecto, todas)")
+    parser.add_argument("--fuente", default=None, help="Parquet limpio de dimensiones (por defecto, el cubo limpio)")
+    parser.add_argument("--fuente-taxones", default=None,
+                        help="Parquet limpio taxonomico (por defecto, el cubo taxonomico limpio)")
+    parser.add_argument("--listar", action="store_true", help="Muestra las graficas registradas")
+    parser.add_argument("--mostrar", action="store_true", help="Abre cada grafica en el navegador")
+    args = parser.parse_args()
+
+    if args.listar:
+        for nombre in sorted(graficas):
+            print(nombre)
+        sys.exit(0)
+
+    desconocidas = [nombre for nombre in args.nombres if nombre not in graficas]
+    if desconocidas:
+        parser.error(f"graficas no registradas: {', '.join(desconocidas)}")
+
+    # Solo se cargan los cubos que usan las graficas pedidas
+    fuentes = {"dimensiones": args.fuente, "taxones": args.fuente_taxones}
+    datos = {}
+    for cubo in sorted({graficas[nombre].cubo for nombre in args.nombres}):
+        inicio = time.perf_counter()
+        datos[cubo] = cargar_datos(fuentes[cubo], en_memoria=True, cubo=cubo)
+        print(f"✓ Datos cargados: {cubo} ({time.perf_counter() - inicio:.2f} s)")
+
+    for nombre in args.nombres:
+        inicio = time.perf_counter()
+        fig = graficas[nombre](datos[graficas[nombre].cubo])
+        print(f"✓ {nombre} ({time.perf_counter() - inicio:.2f} s)")
+        if args.mostrar:
+            fig.show()
@@ -0,0 +1,198 @@
+# ============================================================
+# Limpieza canonica de los cubos del SNIB.
+# Cada script tenia su propia lista de valores a excluir ("NO APLICA",
+# "NO DISPONIBLE", "", "null", ...) y sus propios trucos de texto para
+# aniocolecta. Aqui se hace una sola vez sobre los cubos:
+#   - se quitan espacios en los extremos de las columnas de texto
+#   - los centinelas de las dimensiones pasan a null
+#   - aniocolecta pasa a Int16 ("null", "0" y valores no numericos son null)
+#   - las columnas de texto se guardan como pl.Enum con el diccionario
+#     global de snib_esquema
+# Los dos cubos (snib_cubo.py) se limpian juntos y se guardan junto al cubo
+# (<cubo>_limpio.parquet y <cubo>_taxones_limpio.parquet); se regeneran solo
+# cuando el cubo cambia, asi las consultas solo filtran nulos.
+#
+# Uso:
+#   snib_lazy_df = cargar_limpio()      # dimensiones
+#   taxones_lazy_df = cargar_taxones()  # rangos taxonomicos
+#   python snib_limpieza.py             # regenera los cubos limpios
+# ============================================================
+
+import argparse
+import os
+import threading
+
+import polars as pl
+
+from snib_cubo import (
+    CUBO_PATH,
+    CUBO_TAXONES_PATH,
+    DIMENSIONES,
+    FILAS_POR_ROW_GROUP,
+    ORDEN_FISICO,
+    RANGOS_TAXONOMICOS,
+    cargar_cubo,
+    cubos,
+    ruta_taxones,
+)
+from snib_ejecucion import ejecutar_varios
+from snib_esquema import DICCIONARIO_PATH, actualizar_diccionario, resumen_esquema, tipos
+from snib_perfil import perfilado
+
+
+def ruta_limpio(cubo_path):
+    """Ruta del cubo limpio que corresponde a ``cubo_path`` (<cubo>_limpio.parquet)."""
+    return os.path.splitext(cubo_path)[0] + "_limpio.parquet"
+
+
+CUBO_LIMPIO_PATH = os.environ.get("SNIB_CUBO_LIMPIO", ruta_limpio(CUBO_PATH))
+TAXONES_LIMPIO_PATH = os.environ.get("SNIB_TAXONES_LIMPIO", ruta_limpio(CUBO_TAXONES_PATH))
+
+# Subir este numero cuando cambien las reglas: obliga a regenerar los cubos limpios
+VERSION_LIMPIEZA = "3"
+
+# Los dashboards cargan en hilos del mismo proceso: solo uno regenera a la vez
+# y los demas leen lo que escribio en vez de pisar sus archivos temporales
+_REGENERANDO = threading.Lock()
+
+# Se comparan sin espacios y en mayusculas
+CENTINELAS = ["", "NO APLICA", "NO DISPONIBLE", "NAN", "NULL"]
+
+COLUMNAS_CON_CENTINELAS = [columna for columna in DIMENSIONES if columna != "aniocolecta"]
+
+
+def normalizar(cubo_lazy_df, llaves=DIMENSIONES):
+    """Plan lazy con los valores limpios de las ``llaves`` del cubo, aun como texto y sin reagrupar.
+
+    Los rangos taxonomicos solo se recortan: el sunburst usa los valores
+    vacios como nodos intermedios.
+    """
+    anio = pl.col("aniocolecta").cast(pl.Utf8).str.strip_chars().cast(pl.Int16, strict=False)
+    expresiones = [
+        pl.when(~pl.col(columna).str.strip_chars().str.to_uppercase().is_in(CENTINELAS))
+        .then(pl.col(columna).str.strip_chars())
+        .alias(columna)
+        for columna in COLUMNAS_CON_CENTINELAS
+        if columna in llaves
+    ]
+    if "aniocolecta" in llaves:
+        expresiones.append(pl.when(anio != 0).then(anio).alias("aniocolecta"))
+    expresiones += [pl.col(rango).str.strip_chars() for rango in RANGOS_TAXONOMICOS if rango in llaves]
+    return cubo_lazy_df.with_columns(expresiones)
+
+
+def limpiar(cubo_lazy_df, diccionario, llaves=DIMENSIONES, orden=ORDEN_FISICO):
+    """Plan lazy con el cubo limpio y tipado, reagrupado por ``llaves``.
+
+    Al volver centinelas a null, combinaciones que antes eran distintas
+    (por ejemplo "NO APLICA" y "") quedan iguales; se suman sus conteos.
+    """
+    return (
+        normalizar(cubo_lazy_df, llaves)
+        .group_by(llaves)
+        .agg(pl.col("conteo").sum())
+        .cast(tipos(diccionario, llaves))
+        .sort(orden, nulls_last=True)
+    )
+
+
+@perfilado("limpieza")
+def escribir_limpio(
+    cubo_path=CUBO_PATH,
+    limpio_path=CUBO_LIMPIO_PATH,
+    taxones_limpio_path=TAXONES_LIMPIO_PATH,
+    diccionario_path=DICCIONARIO_PATH,
+):
+    """Limpia el cubo de dimensiones y el taxonomico con un mismo diccionario."""
+    limpios = [
+        (ruta, llaves, orden, limpio)
+        for (ruta, llaves, orden), limpio in zip(cubos(cubo_path), [limpio_path, taxones_limpio_path])
+    ]
+
+    # El diccionario se actualiza una sola vez con los valores de ambos cubos
+    diccionario = actualizar_diccionario(
+        pl.concat(
+            [normalizar(cargar_cubo(ruta), llaves) for ruta, llaves, _, _ in limpios],
+            how="diagonal",
+        ),
+        diccionario_path,
+    )
+
+    temporales = [f"{limpio}.{os.getpid()}.tmp" for _, _, _, limpio in limpios]
+    ejecutar_varios([
+        limpiar(cargar_cubo(ruta), diccionario, llaves, orden).sink_parquet(
+            temporal,
+            compression="zstd",
+            statistics=True,
+            row_group_size=FILAS_POR_ROW_GROUP,
+            metadata={"snib_limpieza": VERSION_LIMPIEZA},
+            lazy=True,
+        )
+        for (ruta, llaves, orden, _), temporal in zip(limpios, temporales)
+    ])
+    for (_, _, _, limpio), temporal in zip(limpios, temporales):
+        os.replace(temporal, limpio)
+
+
+def _vigente(limpio_path, cubo_path):
+    if not os.path.exists(limpio_path):
+        return False
+    if os.path.getmtime(limpio_path) < os.path.getmtime(cubo_path):
+        return False
+    return pl.read_parquet_metadata(limpio_path).get("snib_limpieza") == VERSION_LIMPIEZA
+
+
+def _rutas_limpias(cubo_path):
+    """Cubos limpios (dimensiones, taxonomico) de ``cubo_path``: los del modulo si es el cubo por defecto."""
+    if cubo_path == CUBO_PATH:
+        return CUBO_LIMPIO_PATH, TAXONES_LIMPIO_PATH
+    return ruta_limpio(cubo_path), ruta_limpio(ruta_taxones(cubo_path))
+
+
+def cargar_limpio(limpio_path=CUBO_LIMPIO_PATH, cubo_path=CUBO_PATH):
+    """LazyFrame sobre el cubo limpio de dimensiones; lo regenera si falta o es mas viejo que el cubo."""
+    if os.path.exists(cubo_path) and not _vigente(limpio_path, cubo_path):
+        with _REGENERANDO:
+            if not _vigente(limpio_path, cubo_path):
+                # Se limpian los dos cubos: el otro va junto a su cubo, no a la ruta por defecto
+                escribir_limpio(cubo_path, limpio_path, _rutas_limpias(cubo_path)[1])
+    return _scan_limpio(limpio_path, cubo_path)
+
+
+def cargar_taxones(limpio_path=TAXONES_LIMPIO_PATH, cubo_path=CUBO_PATH):
+    """LazyFrame sobre el cubo taxonomico limpio (reino a genero); lo regenera como ``cargar_limpio``."""
+    taxones_path = ruta_taxones(cubo_path)
+    if os.path.exists(taxones_path) and not _vigente(limpio_path, taxones_path):
+        with _REGENERANDO:
+            if not _vigente(limpio_path, taxones_path):
+                escribir_limpio(cubo_path, _rutas_limpias(cubo_path)[0], limpio_path)
+    return _scan_limpio(limpio_path, taxones_path)
+
+
+def _scan_limpio(limpio_path, cubo_path):
+    if not os.path.exists(limpio_path):
+        # Sin cubo ni cubo limpio: cargar_cubo explica como generarlo
+        cargar_cubo(cubo_path)
+    return pl.scan_parquet(limpio_path)
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenera los cubos limpios del SNIB.")
+    parser.add_argument("--cubo", default=CUBO_PATH, help="Ruta del cubo generado por snib_cubo.py")
+    parser.add_argument("--salida", default=CUBO_LIMPIO_PATH, help="Ruta del cubo limpio de dimensiones")
+    parser.add_argument("--salida-taxones", default=TAXONES_LIMPIO_PATH, help="Ruta del cubo taxonomico limpio")
+    args = parser.parse_args()
+
+    escribir_limpio(args.cubo, args.salida, args.salida_taxones)
+
+    for ruta in (args.salida, args.salida_taxones):
+        limpio_lazy_df = pl.scan_parquet(ruta)
+        combinaciones, ejemplares = limpio_lazy_df.select(pl.len(), pl.col("conteo").sum()).collect().row(0)
+        print(f"✓ Cubo limpio escrito en: {ruta}")
+        print(f"✓ Combinaciones: {combinaciones}")
+        print(f"✓ Ejemplares: {ejemplares}")
+        print(f"✓ Tipos: {resumen_esquema(limpio_lazy_df.collect_schema())}")
@@ -0,0 +1,207 @@
+# ============================================================
+# Metricas de latencia de los callbacks de los dashboards del SNIB.
+# Los callbacks con cache de figuras (snib_cache_figuras.py) se miden solos:
+#   - latencia de cada llamada, separando aciertos y fallos del cache
+#   - en los fallos, el tiempo de cada fase: filtrado de los datos (lo que el
+#     callback marque con ``fase("filtrado")``), construccion de las figuras
+#     (el resto del callback) y serializacion a JSON de Plotly
+#   - por peticion HTTP: la fase "respuesta" (Dash arma el JSON y lo envia) y
+#     el tamaño de la respuesta en bytes
+#   - aciertos y fallos del cache
+#   - las combinaciones de entradas mas lentas (p. ej. año|país)
+#
+# exponer_metricas publica todo en /metrics con el formato de texto de
+# Prometheus, para que un colector local lo consulte. Con varios workers de
+# gunicorn cada proceso lleva sus propias metricas (como /cache-figuras).
+#
+# Uso:
+#   @cache_figuras()
+#   def update_charts(anio, pais, listos):
+#       with fase("filtrado"):
+#           ...
+#   exponer_metricas(app, update_charts)
+# ============================================================
+
+import contextlib
+import threading
+import time
+
+from flask import Response, request
+
+# Limites de los histogramas (segundos y bytes)
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_BYTES = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+# Combinaciones de entradas mas lentas que se guardan por callback
+COMBINACIONES_LENTAS = 10
+
+_local = threading.local()
+_candado = threading.Lock()
+
+
+class Histograma:
+    """Histograma acumulado con etiquetas, en el formato de Prometheus."""
+
+    def __init__(self, nombre, ayuda, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = limites
+        # etiquetas -> [conteos por limite, suma, total]
+        self.series = {}
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with _candado:
+            serie = self.series.setdefault(clave, [[0] * len(self.limites), 0.0, 0])
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exposicion(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with _candado:
+            series = [(clave, list(conteos), suma, total) for clave, (conteos, suma, total) in self.series.items()]
+        for clave, conteos, suma, total in sorted(series):
+            for limite, conteo in zip(self.limites, conteos):
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', repr(float(limite))),))} {conteo}")
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', '+Inf'),))} {total}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(clave)} {suma!r}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(clave)} {total}")
+        return lineas
+
+
+def _etiquetas(clave):
+    if not clave:
+        return ""
+    pares = []
+    for nombre, valor in clave:
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+LATENCIA = Histograma(
+    "snib_callback_segundos",
+    "Latencia de cada llamada al callback, por resultado del cache de figuras.",
+    LIMITES_SEGUNDOS,
+)
+FASES = Histograma(
+    "snib_callback_fase_segundos",
+    "Tiempo de cada fase del callback: filtrado, figura, serializacion y respuesta.",
+    LIMITES_SEGUNDOS,
+)
+RESPUESTA = Histograma(
+    "snib_callback_respuesta_bytes",
+    "Tamaño de la respuesta HTTP del callback.",
+    LIMITES_BYTES,
+)
+
+# callback -> {entradas: segundos} de los fallos mas lentos
+_lentas = {}
+
+
+# ============================================================
+# REGISTRO DESDE LOS CALLBACKS
+# ============================================================
+
+@contextlib.contextmanager
+def fase(nombre):
+    """Marca un bloque del callback como la fase ``nombre`` (p. ej. "filtrado")."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases = getattr(_local, "fases", None)
+        if fases is not None:
+            fases[nombre] = fases.get(nombre, 0.0) + time.perf_counter() - inicio
+
+
+def iniciar_fases():
+    """Empieza a acumular las fases marcadas en este hilo; devuelve el diccionario."""
+    _local.fases = {}
+    return _local.fases
+
+
+def observar_generacion(callback, args, segundos_callback, segundos_serializacion):
+    """Fallo del cache: reparte el tiempo del callback entre sus fases."""
+    fases = getattr(_local, "fases", None) or {}
+    _local.fases = None
+    marcadas = sum(fases.values())
+    for nombre, segundos in fases.items():
+        FASES.observar(segundos, callback=callback, fase=nombre)
+    FASES.observar(max(segundos_callback - marcadas, 0.0), callback=callback, fase="figura")
+    FASES.observar(segundos_serializacion, callback=callback, fase="serializacion")
+
+    # Las combinaciones de entradas mas lentas, para ubicar los casos caros
+    entradas = "|".join(str(arg) for arg in args)
+    total = segundos_callback + segundos_serializacion
+    with _candado:
+        lentas = _lentas.setdefault(callback, {})
+        lentas[entradas] = max(total, lentas.get(entradas, 0.0))
+        if len(lentas) > COMBINACIONES_LENTAS:
+            del lentas[min(lentas, key=lentas.get)]
+
+
+def observar_llamada(callback, segundos, en_cache):
+    """Llamada completa al callback (con o sin acierto del cache)."""
+    LATENCIA.observar(segundos, callback=callback, cache="acierto" if en_cache else "fallo")
+    # La peticion HTTP en curso (si la hay) completa la medicion al responder
+    _local.peticion = (callback, time.perf_counter())
+
+
+# ============================================================
+# EXPOSICION
+# ============================================================
+
+def exposicion(*callbacks):
+    """Texto de todas las metricas en el formato de Prometheus."""
+    lineas = LATENCIA.exposicion() + FASES.exposicion() + RESPUESTA.exposicion()
+
+    lineas += [
+        "# HELP snib_cache_figuras_consultas_total Consultas al cache de figuras por resultado.",
+        "# TYPE snib_cache_figuras_consultas_total counter",
+    ]
+    for callback in callbacks:
+        info = callback.cache_info()
+        for resultado, valor in (("acierto", info.hits), ("fallo", info.misses)):
+            clave = (("callback", callback.__name__), ("resultado", resultado))
+            lineas.append(f"snib_cache_figuras_consultas_total{_etiquetas(clave)} {valor}")
+
+    lineas += [
+        "# HELP snib_callback_lentas_segundos Fallos del cache mas lentos por combinacion de entradas.",
+        "# TYPE snib_callback_lentas_segundos gauge",
+    ]
+    with _candado:
+        lentas = [(callback, dict(entradas)) for callback, entradas in sorted(_lentas.items())]
+    for callback, entradas in lentas:
+        for combinacion, segundos in sorted(entradas.items(), key=lambda par: -par[1]):
+            clave = (("callback", callback), ("entradas", combinacion))
+            lineas.append(f"snib_callback_lentas_segundos{_etiquetas(clave)} {segundos!r}")
+
+    return "\n".join(lineas) + "\n"
+
+
+def exponer_metricas(app, *callbacks, ruta="/metrics"):
+    """Mide las respuestas de los callbacks y publica las metricas en ``ruta``."""
+
+    @app.server.before_request
+    def _iniciar_peticion():
+        _local.peticion = None
+
+    @app.server.after_request
+    def _medir_respuesta(respuesta):
+        peticion = getattr(_local, "peticion", None)
+        _local.peticion = None
+        if peticion is not None and request.path.endswith("_dash-update-component"):
+            callback, fin_callback = peticion
+            FASES.observar(time.perf_counter() - fin_callback, callback=callback, fase="respuesta")
+            tamano = respuesta.calculate_content_length()
+            if tamano is not None:
+                RESPUESTA.observar(tamano, callback=callback)
+        return respuesta
+
+    @app.server.route(ruta)
+    def _metricas():
+        return Response(exposicion(*callbacks), content_type="text/plain; version=0.0.4; charset=utf-8")
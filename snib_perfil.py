@@ -0,0 +1,257 @@
+# ============================================================
+# Perfilado opcional de los pipelines del SNIB.
+# Con SNIB_PERFIL=<ruta.jsonl> cada etapa instrumentada agrega una linea JSON
+# al archivo con su duracion, el pico de memoria del proceso durante la etapa
+# y, en las consultas, las filas estimadas de entrada, las filas de salida y
+# los nodos del plan optimizado. Sin la variable no se mide nada.
+#
+# Etapas instrumentadas:
+#   - consulta / consultas: todo lo que pasa por snib_ejecucion
+#   - cubo, cubo_incremental, limpieza, indice_taxonomico: generacion de datos
+#   - grafica:<nombre>: cada grafica registrada (snib_graficas.py)
+#   - carga:<dashboard>: la carga en segundo plano de cada dashboard
+#   - callback:<funcion>: callbacks con cache de figuras
+# Cada linea lleva la etapa que la contiene ("padre"), asi las consultas de
+# una grafica o de un callback se pueden agrupar.
+#
+# Uso:
+#   SNIB_PERFIL=./data/perfil.jsonl python Grafica_areas-colecciones.py
+#   python snib_perfil.py ./data/perfil.jsonl       # resumen por etapa
+# ============================================================
+
+import argparse
+import contextlib
+import datetime
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+RUTA_PERFIL = os.environ.get("SNIB_PERFIL")
+
+# Cada cuanto se mide la memoria residente durante una etapa (segundos)
+INTERVALO_MEMORIA = 0.01
+
+_local = threading.local()
+_candado = threading.Lock()
+
+
+def activo():
+    return bool(RUTA_PERFIL)
+
+
+# ============================================================
+# MEMORIA
+# ============================================================
+
+def memoria_residente_mb():
+    """Memoria residente actual del proceso (Linux), o None si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def pico_proceso_mb():
+    """Pico de memoria residente desde que inicio el proceso, o None (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss esta en KB en Linux y en bytes en macOS
+    return pico / 1024 / 1024 if sys.platform == "darwin" else pico / 1024
+
+
+class _MuestreoMemoria:
+    """Pico de memoria residente mientras dura una etapa.
+
+    En Linux se muestrea /proc/self/statm en un hilo; en otros sistemas se usa
+    el pico del proceso (que puede venir de una etapa anterior).
+    """
+
+    def __init__(self):
+        self.pico = memoria_residente_mb()
+        self._fin = threading.Event()
+        self._hilo = None
+        if self.pico is not None:
+            self._hilo = threading.Thread(target=self._muestrear, name="perfil-memoria", daemon=True)
+            self._hilo.start()
+
+    def _muestrear(self):
+        while not self._fin.wait(INTERVALO_MEMORIA):
+            self.pico = max(self.pico, memoria_residente_mb() or 0)
+
+    def detener(self):
+        if self._hilo is None:
+            return pico_proceso_mb()
+        self._fin.set()
+        self._hilo.join()
+        return max(self.pico, memoria_residente_mb() or 0)
+
+
+# ============================================================
+# ETAPAS
+# ============================================================
+
+def _escribir(registro):
+    linea = json.dumps(registro, ensure_ascii=False, default=str)
+    with _candado:
+        os.makedirs(os.path.dirname(os.path.abspath(RUTA_PERFIL)), exist_ok=True)
+        with open(RUTA_PERFIL, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+
+@contextlib.contextmanager
+def etapa(nombre, **datos):
+    """Mide el bloque como una etapa y la agrega al log.
+
+    Devuelve el registro de la etapa para que el bloque agregue datos (por
+    ejemplo, las filas de salida). Sin SNIB_PERFIL no hace nada.
+    """
+    if not activo():
+        yield {}
+        return
+
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+
+    registro = {
+        "etapa": nombre,
+        "padre": pila[-1]["etapa"] if pila else None,
+        "pid": os.getpid(),
+        "inicio": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        **datos,
+    }
+    pila.append(registro)
+    memoria = _MuestreoMemoria()
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as error:
+        registro["error"] = repr(error)
+        raise
+    finally:
+        registro["ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        pico = memoria.detener()
+        registro["pico_memoria_mb"] = None if pico is None else round(pico, 1)
+        pila.pop()
+        _escribir(registro)
+
+
+def perfilado(nombre):
+    """Decorador: cada llamada a la funcion es una etapa ``nombre``."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+# Palabras del texto de explain() que no son nodos del plan
+_NO_NODOS = {"FROM", "PROJECT", "SELECTION", "ESTIMATED", "BUILD", "LEFT", "RIGHT", "PLAN", "END"}
+
+
+def describir_plan(lazy_df):
+    """Filas estimadas que leen los scans y nodos del plan optimizado."""
+    plan = lazy_df.explain()
+    filas = [int(valor) for valor in re.findall(r"ESTIMATED ROWS: (\d+)", plan)]
+    nodos = []
+    for linea in plan.splitlines():
+        if "SCAN [" in linea:
+            nodos.append("SCAN")
+            continue
+        nodo = re.match(r"\s*([A-Z][A-Z_]*(?: JOIN)?)\b", linea)
+        if nodo and nodo.group(1) not in _NO_NODOS:
+            nodos.append(nodo.group(1))
+    return {
+        "filas_entrada_estimadas": sum(filas) if filas else None,
+        "nodos": nodos,
+        "plan": plan,
+    }
+
+
+def ejecutar_perfilado(lazy_df, ejecutar, nombre="consulta"):
+    """Ejecuta ``ejecutar()`` (que materializa ``lazy_df``) como una etapa con su plan.
+
+    Siempre corre la ejecucion real (streaming): asi el tiempo y el pico de
+    memoria son los de la corrida que se perfila.
+    """
+    with etapa(nombre, **describir_plan(lazy_df)) as registro:
+        resultado_df = ejecutar()
+        if hasattr(resultado_df, "height"):
+            registro["filas_salida"] = resultado_df.height
+    return resultado_df
+
+
+def ejecutar_varios_perfilado(lazy_dfs, ejecutar, nombre="consultas"):
+    """Como ``ejecutar_perfilado`` para varios planes ejecutados juntos."""
+    planes = [describir_plan(lazy_df) for lazy_df in lazy_dfs]
+    estimadas = [plan["filas_entrada_estimadas"] for plan in planes]
+    with etapa(
+        nombre,
+        planes=len(planes),
+        filas_entrada_estimadas=sum(filas for filas in estimadas if filas) or None,
+        nodos=[plan["nodos"] for plan in planes],
+        plan=[plan["plan"] for plan in planes],
+    ) as registro:
+        resultados = ejecutar()
+        registro["filas_salida"] = [getattr(resultado, "height", None) for resultado in resultados]
+    return resultados
+
+
+# ============================================================
+# RESUMEN DEL LOG
+# ============================================================
+
+def leer_perfil(ruta=RUTA_PERFIL):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def resumir(registros):
+    """Por etapa: veces, tiempo total, medio y maximo, y el mayor pico de memoria."""
+    resumen = {}
+    for registro in registros:
+        fila = resumen.setdefault(registro["etapa"], {"veces": 0, "ms_total": 0.0, "ms_max": 0.0, "pico_mb": None})
+        fila["veces"] += 1
+        fila["ms_total"] += registro["ms"]
+        fila["ms_max"] = max(fila["ms_max"], registro["ms"])
+        if registro.get("pico_memoria_mb") is not None:
+            fila["pico_mb"] = max(fila["pico_mb"] or 0, registro["pico_memoria_mb"])
+    return resumen
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume un log de perfilado del SNIB.")
+    parser.add_argument("ruta", nargs="?", default=RUTA_PERFIL, help="Archivo JSONL (por defecto SNIB_PERFIL)")
+    args = parser.parse_args()
+
+    if not args.ruta:
+        parser.error("indique el archivo o defina SNIB_PERFIL")
+
+    resumen = resumir(leer_perfil(args.ruta))
+
+    print(f"{'etapa':44} {'veces':>6} {'total ms':>11} {'medio ms':>10} {'max ms':>10} {'pico MB':>9}")
+    for nombre, fila in sorted(resumen.items(), key=lambda par: -par[1]["ms_total"]):
+        pico = "-" if fila["pico_mb"] is None else f"{fila['pico_mb']:.0f}"
+        print(
+            f"{nombre:44} {fila['veces']:6} {fila['ms_total']:11.1f} "
+            f"{fila['ms_total'] / fila['veces']:10.1f} {fila['ms_max']:10.1f} {pico:>9}"
+        )
@@ -0,0 +1,40 @@
+# ============================================================
+# Traduccion al español de procedenciaejemplar.
+# Un solo diccionario para todas las graficas y dashboards. La traduccion se
+# aplica despues de agregar: procedenciaejemplar es un Enum del cubo limpio,
+# asi que basta traducir sus categorias una vez y reasignar cada codigo a su
+# etiqueta, sin join contra las filas.
+#
+# Uso:
+#   .group_by([..., "procedenciaejemplar"]).agg(...)
+#   .with_columns(traducir("procedenciaejemplar", tipo).alias("procedenciaejemplar_es"))
+# ============================================================
+
+import polars as pl
+
+PROCEDENCIA_ES = {
+    "HumanObservation": "Observación humana",
+    "PreservedSpecimen": "Especimen preservado",
+    "MachineObservation": "Observación de máquina",
+    "LivingSpecimen": "Especimen vivo",
+    "FossilSpecimen": "Especimen fósil",
+    "Occurrence": "Evidencia",
+    "Materialsample": "Muestra de material",
+    "MaterialCitation": "Material citado",
+}
+
+
+def etiquetas(tipo):
+    """Etiqueta en español de cada categoria del Enum ``tipo``; las desconocidas quedan igual."""
+    return {categoria: PROCEDENCIA_ES.get(categoria, categoria) for categoria in tipo.categories}
+
+
+def traducir(columna, tipo):
+    """Expresion que traduce la columna Enum ``columna`` (de tipo ``tipo``) al español.
+
+    El resultado es otro Enum con una categoria por etiqueta distinta.
+    """
+    mapeo = etiquetas(tipo)
+    return pl.col(columna).replace_strict(
+        mapeo, return_dtype=pl.Enum(list(dict.fromkeys(mapeo.values())))
+    )
@@ -0,0 +1,79 @@
+# ============================================================
+# Servidor de produccion para los dashboards del SNIB.
+# En lugar de app.run(debug=True) (un solo hilo, con recarga automatica que
+# carga los datos dos veces) levanta varios workers de gunicorn. Antes de
+# arrancarlos, un proceso aparte prepara las tablas del dashboard y las deja
+# como Arrow IPC en un directorio compartido; cada worker las abre mapeadas en
+# memoria (ver snib_compartido.py), asi la memoria no crece con los workers.
+#
+# Uso:
+#   python snib_servidor.py Dashboard1_coleccion_pais --workers 4 --puerto 8050
+#   python snib_servidor.py Dashboard2_procedencia --workers 4 --puerto 8051
+#   python snib_servidor.py Dashboard3_taxonomia --workers 4 --puerto 8052
+#
+# Requiere gunicorn (pip install gunicorn), disponible solo en Linux/macOS.
+# ============================================================
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+
+DIRECTORIO_PROYECTO = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_IPC = os.environ.get("SNIB_DATOS_IPC", os.path.join(".", "data", "ipc"))
+
+
+def servir(modulo, workers=4, host="0.0.0.0", puerto=8050, directorio_ipc=DIRECTORIO_IPC):
+    if importlib.util.find_spec("gunicorn") is None:
+        sys.exit("Se necesita gunicorn para el modo de produccion: pip install gunicorn")
+
+    os.environ["SNIB_DATOS_IPC"] = os.path.abspath(directorio_ipc)
+
+    # Cargar el dashboard una vez fuera de los workers genera los archivos IPC;
+    # los workers solo los abren y ninguno repite el procesamiento
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), modulo, "--precargar"],
+        cwd=DIRECTORIO_PROYECTO, check=True,
+    )
+
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn",
+        "--chdir", DIRECTORIO_PROYECTO,
+        "--workers", str(workers),
+        "--bind", f"{host}:{puerto}",
+        f"{modulo}:server",
+    ])
+
+
+def precargar(modulo):
+    """Importa el dashboard y espera su carga: al terminar, las tablas IPC ya estan escritas.
+
+    La carga corre en un hilo en segundo plano (snib_carga.py); sin esperarla,
+    el proceso terminaria antes de escribir nada.
+    """
+    dashboard = importlib.import_module(modulo)
+    carga = getattr(dashboard, "carga", None)
+    if carga is not None:
+        carga.esperar()
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sirve un dashboard del SNIB con varios workers.")
+    parser.add_argument("modulo", choices=["Dashboard1_coleccion_pais", "Dashboard2_procedencia", "Dashboard3_taxonomia"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8050)
+    parser.add_argument("--ipc", default=DIRECTORIO_IPC, help="Directorio de las tablas compartidas")
+    parser.add_argument("--precargar", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.precargar:
+        precargar(args.modulo)
+        sys.exit(0)
+
+    servir(args.modulo, args.workers, args.host, args.puerto, args.ipc)
@@ -0,0 +1,142 @@
+# ============================================================
+# Indice jerarquico de la taxonomia del SNIB (reino a genero).
+# Se construye una vez a partir del cubo taxonomico limpio: una fila por nodo
+# del arbol con su id (la ruta "Animalia/Chordata/..."), su padre, su nivel,
+# su etiqueta y el total de ejemplares debajo de el. Se guarda junto al cubo
+# (<cubo>_taxonomia.parquet) ordenado por padre, asi los hijos de cualquier
+# nodo son un bloque contiguo que se lee sin recontar.
+#
+# Las graficas cargan solo los primeros niveles y piden los subarboles mas
+# profundos cuando hacen falta, en lugar de mandar el arbol completo.
+#
+# Uso:
+#   indice = IndiceTaxonomico.cargar()
+#   nodos_df = indice.subarbol(profundidad=3)
+#   nodos_df = indice.subarbol("Animalia/Chordata", profundidad=2)
+#   python snib_taxonomia.py    # regenera el indice
+# ============================================================
+
+import argparse
+import os
+
+import polars as pl
+
+from snib_compartido import indice_rebanadas, vigente
+from snib_cubo import CUBO_PATH, CUBO_TAXONES_PATH, RANGOS_TAXONOMICOS
+from snib_ejecucion import ejecutar
+from snib_limpieza import TAXONES_LIMPIO_PATH, cargar_taxones
+from snib_perfil import perfilado
+
+INDICE_TAXONOMIA_PATH = os.environ.get(
+    "SNIB_TAXONOMIA", os.path.splitext(CUBO_PATH)[0] + "_taxonomia.parquet"
+)
+
+SEPARADOR = "/"
+RAIZ = ""
+
+NOMBRES_RANGOS = ["Reino", "Phylum/División", "Clase", "Orden", "Familia", "Género"]
+
+
+def construir_indice(lazy_df):
+    """DataFrame con un nodo por fila: id, padre, nivel, rango, etiqueta y total.
+
+    Una sola agregacion del cubo hasta genero; los niveles superiores se suman
+    en memoria a partir de ese resultado. Los rangos vacios quedan como ""
+    (igual que en el sunburst original); se descartan los registros sin reino.
+    """
+    generos_df = ejecutar(
+        lazy_df
+        .filter(pl.col("reinovalido").is_not_null() & (pl.col("reinovalido") != ""))
+        .group_by(RANGOS_TAXONOMICOS)
+        .agg(pl.col("conteo").sum())
+        .with_columns(pl.col(RANGOS_TAXONOMICOS).cast(pl.Utf8).fill_null(""))
+    )
+
+    niveles = []
+    for nivel, rango in enumerate(RANGOS_TAXONOMICOS):
+        ruta = RANGOS_TAXONOMICOS[: nivel + 1]
+        padre = pl.concat_str(ruta[:-1], separator=SEPARADOR) if nivel else pl.lit(RAIZ)
+        niveles.append(
+            generos_df
+            .group_by(ruta)
+            .agg(pl.col("conteo").sum().cast(pl.UInt64).alias("total"))
+            .select(
+                pl.concat_str(ruta, separator=SEPARADOR).alias("id"),
+                padre.alias("padre"),
+                pl.lit(nivel, dtype=pl.UInt8).alias("nivel"),
+                pl.lit(rango).alias("rango"),
+                pl.col(rango).alias("etiqueta"),
+                "total",
+            )
+        )
+
+    # Por padre y de mayor a menor total: los hijos de un nodo quedan juntos
+    return pl.concat(niveles).sort(["padre", "total", "id"], descending=[False, True, False])
+
+
+@perfilado("indice_taxonomico")
+def escribir_indice(indice_path=INDICE_TAXONOMIA_PATH):
+    indice_df = construir_indice(cargar_taxones())
+    temporal = f"{indice_path}.{os.getpid()}.tmp"
+    indice_df.write_parquet(temporal, compression="zstd")
+    os.replace(temporal, indice_path)
+    return indice_df
+
+
+class IndiceTaxonomico:
+    """Indice cargado en memoria con acceso directo a los hijos de cada nodo."""
+
+    def __init__(self, indice_df):
+        self.nodos = indice_df
+        self._hijos = {padre: posicion for (padre,), posicion in indice_rebanadas(indice_df, ["padre"]).items()}
+
+    @classmethod
+    def cargar(cls, indice_path=INDICE_TAXONOMIA_PATH, fuentes=(CUBO_TAXONES_PATH, TAXONES_LIMPIO_PATH)):
+        """Lee el indice; lo regenera si falta o es mas viejo que alguna de ``fuentes``.
+
+        Se compara tambien contra el cubo taxonomico sin limpiar: el limpio
+        solo se regenera al reconstruir el indice.
+        """
+        if vigente(indice_path, fuentes):
+            return cls(pl.read_parquet(indice_path))
+        return cls(escribir_indice(indice_path))
+
+    def hijos(self, nodo=RAIZ):
+        """Hijos directos de ``nodo`` (una vista sin copia del indice)."""
+        inicio, largo = self._hijos.get(nodo, (0, 0))
+        return self.nodos.slice(inicio, largo)
+
+    def subarbol(self, nodo=RAIZ, profundidad=2):
+        """Descendientes de ``nodo`` hasta ``profundidad`` niveles por debajo de el."""
+        partes = []
+        actuales = [nodo]
+        for _ in range(profundidad):
+            if not actuales:
+                break
+            nivel_df = pl.concat([self.hijos(padre) for padre in actuales])
+            partes.append(nivel_df)
+            actuales = nivel_df["id"].to_list()
+        if not partes:
+            return self.nodos.clear()
+        return pl.concat(partes)
+
+    def nodo(self, nodo):
+        """Fila del nodo ``nodo``, o un DataFrame vacio si no existe."""
+        return self.hijos(nodo.rpartition(SEPARADOR)[0]).filter(pl.col("id") == nodo)
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenera el indice taxonomico del SNIB.")
+    parser.add_argument("--salida", default=INDICE_TAXONOMIA_PATH, help="Ruta del indice")
+    args = parser.parse_args()
+
+    indice_df = escribir_indice(args.salida)
+
+    print(f"✓ Indice taxonomico escrito en: {args.salida}")
+    for nivel, nombre in enumerate(NOMBRES_RANGOS):
+        print(f"  {nombre}: {indice_df.filter(pl.col('nivel') == nivel).height} nodos")
+    print(f"✓ Ejemplares: {indice_df.filter(pl.col('nivel') == 0)['total'].sum()}")
@@ -0,0 +1,84 @@
+# ============================================================
+# Top N con "Otras" para las graficas de ranking del SNIB.
+# Un solo plan lazy: agrupa una vez, calcula el rango de cada elemento con
+# una funcion de ventana, renombra los que quedan fuera del top y reagrupa.
+# Sustituye las tres variantes que habia (rango denso, concat de dos ramas y
+# un collect aparte del top seguido de is_in).
+#
+# Uso:
+#   top_n_con_otras(lazy_df, "coleccion", 10, por=["aniocolecta"])
+# ============================================================
+
+import polars as pl
+
+from snib_esquema import enum_con
+
+
+def top_n_con_otras(
+    lazy_df,
+    columna,
+    n,
+    por=(),
+    unidad=(),
+    conservar=(),
+    valor="conteo",
+    etiqueta="Otras",
+    alias=None,
+    metodo="dense",
+):
+    """Deja los ``n`` valores de ``columna`` con mas ``valor`` y junta el resto en ``etiqueta``.
+
+    - ``por``: particiones con su propio top (por ejemplo, un top por año).
+    - ``unidad``: columnas que junto con ``columna`` forman el elemento que se
+      ordena (Dashboard1 ordena pares pais-coleccion dentro de cada año).
+    - ``conservar``: columnas que se mantienen en el resultado pero no separan
+      el ranking; el total de cada elemento se suma sobre ellas.
+    - ``metodo``: metodo de ``rank``; con "dense" los empates comparten lugar.
+
+    Devuelve un LazyFrame agrupado por ``por + unidad + conservar + [alias]``
+    con la suma de ``valor``.
+    """
+    por, unidad, conservar = list(por), list(unidad), list(conservar)
+    alias = alias or columna
+    elemento = por + unidad + [columna]
+
+    # La etiqueta nueva tiene que caber en el tipo de la columna
+    tipo = lazy_df.collect_schema()[columna]
+    if isinstance(tipo, pl.Enum):
+        tipo = enum_con(tipo, etiqueta)
+
+    agrupado = (
+        lazy_df
+        .group_by(por + unidad + conservar + [columna])
+        .agg(pl.col(valor).sum())
+    )
+
+    rango = pl.col(valor).rank(metodo, descending=True)
+    if por:
+        rango = rango.over(por)
+
+    # Con columnas conservadas un elemento ocupa varias filas: el rango se
+    # calcula sobre el total de cada elemento (una fila por elemento) y se une
+    # de vuelta, asi cualquier ``metodo`` cuenta cada elemento una sola vez
+    if conservar:
+        rangos = (
+            agrupado
+            .group_by(elemento)
+            .agg(pl.col(valor).sum())
+            .select(elemento + [rango.alias("_rango")])
+        )
+        agrupado = agrupado.join(rangos, on=elemento, how="left", nulls_equal=True)
+    else:
+        agrupado = agrupado.with_columns(rango.alias("_rango"))
+
+    return (
+        agrupado
+        .with_columns(
+            pl.when(pl.col("_rango") <= n)
+            .then(pl.col(columna).cast(tipo))
+            .otherwise(pl.lit(etiqueta, dtype=tipo))
+            .alias(alias)
+        )
+        .group_by(por + unidad + conservar + [alias])
+        .agg(pl.col(valor).sum())
+    )